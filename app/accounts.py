@@ -0,0 +1,35 @@
+import logging
+
+from .cache import LRUCache
+from .core import config
+from .database import AsyncSQLDataBase
+
+
+class AccountCache:
+    """
+    Кэш известных аккаунтов: повторный пользователь не обращается к базе.
+
+    Прогревается из таблицы account при старте, промах создает аккаунт
+    идемпотентным upsert вместо пары account_exists + add_account.
+    """
+
+    def __init__(
+        self,
+        database: AsyncSQLDataBase,
+        maxsize: int = config.ACCOUNT_CACHE_SIZE,
+        ttl: float = config.ACCOUNT_CACHE_TTL,
+    ):
+        self.database = database
+        self._known = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    async def warm(self) -> None:
+        chat_ids = await self.database.get_account_ids(limit=self._known.maxsize)
+        for chat_id in chat_ids:
+            self._known.set(chat_id, True)
+        logging.info(f"accounts: warmed {len(chat_ids)} accounts")
+
+    async def ensure(self, chat_id: str) -> None:
+        if chat_id in self._known:
+            return
+        await self.database.ensure_account(user_id=chat_id)
+        self._known.set(chat_id, True)
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Hashable
+
+from .core import config
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Ограниченный по размеру LRU-кэш с необязательным TTL (в секундах)
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float | None = None,
+        on_evict: Callable[[Hashable], None] | None = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires, value = item
+        if expires and expires < time.monotonic():
+            del self._data[key]
+            if self.on_evict is not None:
+                self.on_evict(key)
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl else 0.0
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+
+    def keys(self) -> list[Hashable]:
+        return list(self._data)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class ResponseCache:
+    """
+    Готовые ответы /today, /tomorrow, /week по ключу (chat_id, period, date).
+
+    Запись события инвалидирует только ответы этого чата, чей диапазон
+    содержит дату события. Инвалидация приходит из потоков SQLDataBase,
+    поэтому доступ под блокировкой. Поколение чата защищает от записи в кэш
+    ответа, собранного до конкурентного изменения.
+
+    Записи других процессов (app.importer, веб-интерфейс, другие реплики и
+    воркеры) сюда не доходят, поэтому ответ живет не дольше ttl секунд.
+    Поколения ограничены так же, как ответы: вытесненный чат получает
+    _floor - номер не меньше любого выданного до вытеснения.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = config.RESPONSE_CACHE_SIZE,
+        ttl: float = config.RESPONSE_CACHE_TTL,
+    ):
+        self.enabled = maxsize > 0 and ttl > 0
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl, on_evict=self._evict)
+        self._by_chat: dict[str, set[tuple]] = {}
+        self._generation = LRUCache(maxsize=maxsize, on_evict=self._raise_floor)
+        self._counter = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _forget(self, key: tuple) -> None:
+        keys = self._by_chat.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_chat[key[0]]
+
+    def _evict(self, key: tuple) -> None:
+        self._forget(key)
+        if key[0] not in self._by_chat:
+            self._generation.pop(key[0])
+            self._raise_floor(key[0])
+
+    def _raise_floor(self, chat_id: str) -> None:
+        self._floor = self._counter
+
+    def _bump(self, chat_id: str) -> None:
+        self._counter += 1
+        self._generation.set(chat_id, self._counter)
+
+    def generation(self, chat_id: str) -> int:
+        with self._lock:
+            return self._generation.get(chat_id, self._floor)
+
+    def get(self, chat_id: str, period: str, day: date, version=None) -> str | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._cache.get((chat_id, period, day))
+            if entry is None or entry[2] != version:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[3]
+
+    def set(
+        self,
+        chat_id: str,
+        period: str,
+        day: date,
+        start: datetime,
+        end: datetime,
+        response: str,
+        generation: int = 0,
+        version=None,
+    ) -> None:
+        if not self.enabled:
+            return
+        key = (chat_id, period, day)
+        with self._lock:
+            if self._generation.get(chat_id, self._floor) != generation:
+                return
+            self._cache.set(key, (start, end, version, response))
+            self._by_chat.setdefault(chat_id, set()).add(key)
+
+    def invalidate(self, chat_id: str, moment: datetime) -> None:
+        with self._lock:
+            self._bump(chat_id)
+            for key in list(self._by_chat.get(chat_id, ())):
+                entry = self._cache.get(key)
+                if entry is None or entry[0] <= moment < entry[1]:
+                    self._cache.pop(key)
+                    self._forget(key)
+
+    def invalidate_chat(self, chat_id: str) -> None:
+        with self._lock:
+            self._bump(chat_id)
+            for key in list(self._by_chat.get(chat_id, ())):
+                self._cache.pop(key)
+                self._forget(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._by_chat.clear()
+            self._generation.clear()
+            self._floor = self._counter
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+
+response_cache = ResponseCache()
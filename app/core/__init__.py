@@ -9,11 +9,9 @@ def get_settings() -> AppSettings:
 config = get_settings()
 
 match config.INTERFACE:
-    case "telegram":
+    case "telegram" | "gradio":
+        # в режиме gradio бот нужен для отправки напоминаний
         from .keys import api_key
 
         def get_api_token() -> str:
             return api_key
-
-    case "gradio":
-        pass
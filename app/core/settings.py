@@ -4,8 +4,109 @@ from pydantic_settings import BaseSettings
 class AppSettings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_HOST: str = "localhost"
+    REDIS_DB: int = 0
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_EVENT_CACHE_TTL: int = 300  # s
 
     DATABASE_NAME: str = "chatter"
+    # полный URL SQLAlchemy, например postgresql+psycopg://bot:secret@db/chatter;
+    # пусто - файл SQLite {DATABASE_NAME}.db
+    DATABASE_URL: str = ""
+    DB_EXECUTOR_WORKERS: int = 4
 
-    SERIALIZER: str = "redis"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 3600
+    DB_POOL_PRE_PING: bool = False
+    DB_CONNECT_TIMEOUT: int = 10  # s, Postgres
+    DB_STATEMENT_TIMEOUT: int = 0  # ms, Postgres; 0 - без ограничения
+
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    # NORMAL в WAL: при сбое питания могут пропасть последние транзакции
+    # (при падении процесса - нет); FULL - fsync на каждый commit, с буфером
+    # WriteBehind это один fsync на пачку
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT: int = 5000  # ms
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    # INCREMENTAL: место после удаления возвращается через incremental_vacuum;
+    # для существующей базы вступает в силу после python -m app.retention --vacuum
+    SQLITE_AUTO_VACUUM: str = "INCREMENTAL"
+
+    ACCOUNT_CACHE_SIZE: int = 100_000
+    ACCOUNT_CACHE_TTL: float = 3600.0
+    RESPONSE_CACHE_SIZE: int = 10_000
+    # записи других процессов видны не позже чем через TTL; 0 - без кэша
+    RESPONSE_CACHE_TTL: float = 30.0  # s
+    TIMETABLE_CACHE_CLASSES: int = 1000
+    TIMETABLE_CACHE_TTL: float = 600.0
+    # сверка версий загруженных расписаний классов (python -m app.timetable);
+    # 0 - только по TIMETABLE_CACHE_TTL
+    TIMETABLE_CHECK_SECONDS: float = 30.0
+
+    REMINDER_LEAD_MINUTES: int = 60
+    # окно, на которое события загружаются в память (и раскрываются серии)
+    REMINDER_HORIZON_HOURS: int = 24
+    # перечитывание окна: события, добавленные другими репликами; 0 - выкл.
+    REMINDER_RESCAN_MINUTES: int = 5
+    # аренда лидера, который сканирует и отправляет напоминания
+    LEADER_LEASE_TTL: float = 30.0
+
+    IMPORT_BATCH_SIZE: int = 5000
+    # user id Telegram, которым /import разрешает chat_id других чатов;
+    # в окружении JSON, например IMPORT_ADMIN_IDS=[12345]
+    IMPORT_ADMIN_IDS: set[int] = set()
+    # групповая фиксация записей (app.database.writer): пачка уходит через
+    # WRITE_BATCH_MS после первой записи или при WRITE_BATCH_ROWS записях;
+    # 0 ms - без ожидания, пачка копится, пока идет предыдущая фиксация;
+    # WRITE_BATCH_ROWS <= 1 - без буфера
+    WRITE_BATCH_MS: float = 0.0
+    WRITE_BATCH_ROWS: int = 500
+    # событий на странице в веб-интерфейсе (get_user_events_page)
+    EVENT_PAGE_SIZE: int = 50
+
+    # события старше RETENTION_DAYS переносятся в архив; 0 - не удалять
+    RETENTION_DAYS: int = 180
+    RETENTION_ARCHIVE: str = "table"  # "table" - event_archive, "jsonl" - gzip-файлы
+    RETENTION_ARCHIVE_DIR: str = "archive"
+    RETENTION_BATCH_SIZE: int = 500
+    RETENTION_BATCH_PAUSE: float = 0.05  # s между пачками, чтобы не держать запись
+    RETENTION_INTERVAL_HOURS: int = 24
+    RETENTION_VACUUM_PAGES: int = 10_000
+
+    # лимиты Telegram: ~30 сообщений/с всего и ~1 сообщение/с в один чат
+    DELIVERY_WORKERS: int = 16
+    DELIVERY_GLOBAL_RATE: float = 30.0
+    DELIVERY_CHAT_RATE: float = 1.0
+    DELIVERY_MAX_RETRIES: int = 3
+
+    # "memory" - состояние в процессе, "redis" - общее для всех реплик
+    SERIALIZER: str = "memory"
     INTERFACE: str = "telegram"
+
+    # "polling" или "webhook"
+    BOT_MODE: str = "polling"
+    WEBHOOK_BASE_URL: str = ""  # публичный адрес, например https://bot.example.com
+    WEBHOOK_PATH: str = "/webhook"
+    WEBHOOK_HOST: str = "0.0.0.0"
+    WEBHOOK_PORT: int = 8080
+    WEBHOOK_SECRET: str = ""
+    WEBHOOK_MAX_CONNECTIONS: int = 40
+    WEBHOOK_WORKERS: int = 16
+    WEBHOOK_QUEUE_SIZE: int = 1000
+    WEBHOOK_DRAIN_TIMEOUT: float = 10.0
+
+    # INTERFACE=gradio: веб-интерфейс на uvicorn в том же процессе, что и напоминания
+    GRADIO_HOST: str = "0.0.0.0"
+    GRADIO_PORT: int = 7860
+    GRADIO_CONCURRENCY: int = 16  # одновременно выполняемых запросов
+    GRADIO_QUEUE_SIZE: int = 200  # ожидающих в очереди, сверх - отказ
+
+    # >1 - супервизор и процессы-воркеры, апдейты делятся по chat_id
+    WORKERS: int = 1
+    WORKER_QUEUE_SIZE: int = 1000
+    WORKER_CONCURRENCY: int = 16
+
+    # /metrics в формате Prometheus, 0 - выключено; воркер i слушает PORT + i + 1
+    METRICS_HOST: str = "0.0.0.0"
+    METRICS_PORT: int = 0
@@ -1,10 +1,14 @@
 from .base import Event
 from .models import EventCreate
-from .sql import SQLDataBase
+from .sql import AsyncSQLDataBase, SQLDataBase
 
 
 def get_database() -> SQLDataBase:
     return SQLDataBase()
 
 
+def get_async_database(event_cache=None) -> AsyncSQLDataBase:
+    return AsyncSQLDataBase(event_cache=event_cache)
+
+
 __all__ = ["EventCreate", "Event"]
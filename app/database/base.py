@@ -1,19 +1,31 @@
 import enum
+import threading
+import time
 
 from sqlalchemy import (
     Boolean,
     Column,
     DateTime,
+    Engine,
     ForeignKey,
+    Index,
     Integer,
     Text,
     create_engine,
+    event,
+    make_url,
 )
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session, declarative_base, relationship, sessionmaker
 from sqlalchemy.orm.decl_api import registry
-from sqlalchemy_utils import create_database, database_exists
 
 from app.core import config
+from app.metrics import instrument_engine
+
+from .migrations import run_migrations
+
+# попыток создать схему и применить миграции при гонке процессов
+SCHEMA_ATTEMPTS = 5
 
 mapper_registry = registry()
 metadata = mapper_registry.metadata
@@ -25,10 +37,34 @@ Base = declarative_base(metadata=metadata)
 # Tables
 
 
+class SchoolClass(Base):
+    __tablename__ = "school_class"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(Text, nullable=False, unique=True)
+    # растет при каждой перезаписи расписания, None - не перезаписывалось
+    version = Column(Integer, nullable=True)
+
+
+class Lesson(Base):
+    __tablename__ = "lesson"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    class_id = Column(Integer, ForeignKey("school_class.id"), nullable=False)
+    weekday = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False)
+    lesson = Column(Text, nullable=False)
+    time = Column(Text, nullable=False)
+
+    __table_args__ = (
+        Index("ix_lesson_class_weekday", "class_id", "weekday", "position"),
+    )
+
+
 class AccountData(Base):
     __tablename__ = "account"
     id = Column(Integer, primary_key=True, autoincrement=True)
     chat_id = Column(Text, nullable=True, unique=True)
+    # класс пользователя, None - общее расписание из schedule.json
+    class_id = Column(Integer, ForeignKey("school_class.id"), nullable=True)
 
 
 class Event(Base):
@@ -40,6 +76,64 @@ class Event(Base):
     user = relationship("AccountData")
     notified = Column(Boolean, nullable=False, default=False)
 
+    __table_args__ = (
+        # get_events: notified == False и диапазон по event_date
+        Index("ix_event_notified_date", "notified", "event_date"),
+        # get_user_events: user_id и диапазон по event_date
+        Index("ix_event_user_date", "user_id", "event_date"),
+    )
+
+
+class EventSeries(Base):
+    """
+    Повторяющееся событие: одна строка на серию, вхождения вычисляются
+    по rule только в запрошенном окне
+    """
+
+    __tablename__ = "event_series"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event_name = Column(Text, nullable=False)
+    user_id = Column(Text, ForeignKey("account.chat_id"))
+    dtstart = Column(DateTime, nullable=False)
+    rule = Column(Text, nullable=False)
+    # последнее возможное вхождение, NULL - бесконечная серия
+    until = Column(DateTime, nullable=True)
+    # все вхождения <= notified_until уже отправлены
+    notified_until = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_event_series_user", "user_id", "dtstart"),
+        Index("ix_event_series_range", "dtstart", "until"),
+    )
+
+
+class EventArchive(Base):
+    """
+    События, перенесенные из event по сроку хранения (app.retention)
+    """
+
+    __tablename__ = "event_archive"
+    id = Column(Integer, primary_key=True)
+    event_name = Column(Text, nullable=False)
+    event_date = Column(DateTime, nullable=False)
+    user_id = Column(Text)
+    notified = Column(Boolean, nullable=False)
+    archived_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (Index("ix_event_archive_user_date", "user_id", "event_date"),)
+
+
+class LeaderLease(Base):
+    """
+    Аренда роли лидера между репликами: holder продлевает expires_at,
+    остальные могут занять строку только после его истечения
+    """
+
+    __tablename__ = "leader_lease"
+    name = Column(Text, primary_key=True)
+    holder = Column(Text, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
 
 # init
 
@@ -48,26 +142,100 @@ def get_db_config(
     database: str = config.DATABASE_NAME,
     driver: str = "sqlite",
 ):
+    if config.DATABASE_URL:
+        return config.DATABASE_URL
     db_config = f"{driver}:///{database}.db"
     return db_config
 
 
+def get_pool_config() -> dict:
+    return {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+
+
+def get_connect_args(db_config: str) -> dict:
+    if make_url(db_config).get_backend_name() != "postgresql":
+        return {}
+    connect_args = {"connect_timeout": config.DB_CONNECT_TIMEOUT}
+    if config.DB_STATEMENT_TIMEOUT:
+        connect_args["options"] = f"-c statement_timeout={config.DB_STATEMENT_TIMEOUT}"
+    return connect_args
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Применяется к каждому новому соединению пула
+    """
+    cursor = dbapi_connection.cursor()
+    # действует для новой базы, существующей нужен полный VACUUM
+    cursor.execute(f"PRAGMA auto_vacuum={config.SQLITE_AUTO_VACUUM}")
+    cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT}")
+    cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}")
+    cursor.close()
+
+
 class SQLAlchemy:
     """
-    Обертка вокруг engine и session для удобства подмены тестов и обобщения
+    Обертка вокруг engine и session для удобства подмены тестов и обобщения.
+
+    Engine создается при первом обращении, а не при импорте: подключение и
+    миграции не замедляют импорт модулей, которым база не нужна.
     """
 
     def __init__(self):
-        db_config = get_db_config()
-        self.engine = create_engine(db_config)
+        self._engine: Engine | None = None
+        self._sessionmaker: sessionmaker | None = None
+        self._lock = threading.Lock()
 
-        if not database_exists(self.engine.url):
-            create_database(self.engine.url)
-            Base.metadata.drop_all(self.engine)
-            Base.metadata.create_all(self.engine)
+    def _connect(self) -> Engine:
+        from sqlalchemy_utils import create_database, database_exists
 
-        # TODO initialize a database
-        pass
+        db_config = get_db_config()
+        engine = create_engine(
+            db_config, connect_args=get_connect_args(db_config), **get_pool_config()
+        )
+        if engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", set_sqlite_pragmas)
+        instrument_engine(engine)
+
+        for attempt in range(SCHEMA_ATTEMPTS):
+            try:
+                if engine.dialect.name != "sqlite" and not database_exists(engine.url):
+                    # файл SQLite создается при подключении, уже с pragma
+                    # auto_vacuum, которая действует только до первой таблицы
+                    create_database(engine.url)
+                # только недостающие таблицы: пустая база может быть создана
+                # заранее (POSTGRES_DB), миграции рассчитывают на схему
+                Base.metadata.create_all(engine)
+
+                run_migrations(engine, Base.metadata)
+                break
+            except DBAPIError:
+                # воркеры супервизора создают новую базу одновременно: таблицу
+                # или версию миграции успел записать другой процесс
+                if attempt == SCHEMA_ATTEMPTS - 1:
+                    raise
+                time.sleep(0.1 * (attempt + 1))
+
+        # Одна фабрика сессий на все время жизни процесса
+        self._sessionmaker = sessionmaker(bind=engine)
+        return engine
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            # первое обращение может прийти сразу из нескольких потоков пула
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._connect()
+        return self._engine
 
     def get_session(self, **kwargs) -> Session:
         """
@@ -76,8 +244,8 @@ class SQLAlchemy:
             do_some_stuff
 
         """
-        _Session = sessionmaker(bind=self.engine)
-        return _Session(**kwargs)
+        self.engine
+        return self._sessionmaker(**kwargs)
 
 
 db = SQLAlchemy()
@@ -0,0 +1,122 @@
+"""
+Миграции схемы.
+
+create_all создает только отсутствующие таблицы, поэтому изменения уже
+существующих (индексы, новые колонки) описываются здесь и применяются по
+порядку при каждом запуске. Примененные версии хранятся в schema_version.
+"""
+
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Engine,
+    Integer,
+    MetaData,
+    Table,
+    Text,
+    insert,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.engine import Connection
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", Text, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def create_indexes(table_name: str, *names: str) -> Callable:
+    def migrate(connection: Connection, metadata: MetaData):
+        table = metadata.tables[table_name]
+        for index in table.indexes:
+            if index.name in names:
+                index.create(connection, checkfirst=True)
+
+    return migrate
+
+
+def create_tables(*names: str) -> Callable:
+    def migrate(connection: Connection, metadata: MetaData):
+        for name in names:
+            metadata.tables[name].create(connection, checkfirst=True)
+
+    return migrate
+
+
+def add_columns(table_name: str, *names: str) -> Callable:
+    def migrate(connection: Connection, metadata: MetaData):
+        existing = {
+            column["name"] for column in inspect(connection).get_columns(table_name)
+        }
+        table = metadata.tables[table_name]
+        for name in names:
+            if name in existing:
+                continue
+            column = table.c[name]
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(
+                text(f"ALTER TABLE {table_name} ADD COLUMN {name} {column_type}")
+            )
+
+    return migrate
+
+
+def chain(*steps: Callable) -> Callable:
+    def migrate(connection: Connection, metadata: MetaData):
+        for step in steps:
+            step(connection, metadata)
+
+    return migrate
+
+
+# (версия, описание, функция) - только добавлять в конец
+MIGRATIONS: list[tuple[int, str, Callable[[Connection, MetaData], None]]] = [
+    (
+        1,
+        "event indexes for reminder scan and per-user ranges",
+        create_indexes("event", "ix_event_notified_date", "ix_event_user_date"),
+    ),
+    (
+        2,
+        "per-class timetables",
+        chain(
+            create_tables("school_class", "lesson"),
+            add_columns("account", "class_id"),
+        ),
+    ),
+    (3, "recurring event series", create_tables("event_series")),
+    (4, "leader lease", create_tables("leader_lease")),
+    (5, "event archive", create_tables("event_archive")),
+    (6, "class timetable version", add_columns("school_class", "version")),
+]
+
+
+def run_migrations(engine: Engine, metadata: MetaData) -> list[int]:
+    """
+    Применяет недостающие миграции, возвращает список примененных версий
+    """
+    applied_now = []
+    with engine.begin() as connection:
+        schema_version.create(connection, checkfirst=True)
+        applied = set(connection.scalars(select(schema_version.c.version)))
+
+        for version, name, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            migrate(connection, metadata)
+            connection.execute(
+                insert(schema_version).values(
+                    version=version, name=name, applied_at=datetime.now()
+                )
+            )
+            applied_now.append(version)
+
+    return applied_now
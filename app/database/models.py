@@ -1,7 +1,10 @@
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from typing import Literal
 
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, field_validator, model_validator
+
+from .recurrence import RecurrenceRule
 
 
 class EventCreate(BaseModel):
@@ -15,14 +18,129 @@ class EventCreate(BaseModel):
         return value
 
 
-class EventResponse(BaseModel):
+# Результаты чтения - dataclass со __slots__, а не pydantic: строки приходят
+# из базы уже проверенными, а на горячих путях их десятки тысяч. pydantic
+# остается на входе (EventCreate, SeriesCreate).
+
+
+@dataclass(slots=True)
+class EventResponse:
     event_name: str
     event_day: str
     event_time: str
 
 
-class EventNotofication(BaseModel):
+@dataclass(slots=True)
+class EventNotofication:
     event_id: int
     chat_id: str
     event_name: str
     event_date: datetime
+    # для вхождения повторяющегося события event_id - id серии
+    series_id: int | None = None
+
+    @property
+    def key(self) -> tuple:
+        if self.series_id is None:
+            return ("event", self.event_id)
+        return ("series", self.series_id, self.event_date)
+
+
+@dataclass(slots=True)
+class EventPage:
+    """
+    Страница событий пользователя в порядке (event_date, id).
+
+    У вхождений серий в курсоре id = -series_id, чтобы ключ был уникальным.
+    """
+
+    events: list[EventNotofication]
+    # передается в after для следующей страницы, None - страница последняя
+    next_cursor: tuple[datetime, int] | None = None
+
+
+@dataclass(slots=True)
+class ImportResult:
+    # число вставленных событий по чатам
+    inserted: dict[str, int]
+    # вставленные события из окна напоминаний (due_until в import_events)
+    due: list[EventNotofication]
+
+    @property
+    def total(self) -> int:
+        return sum(self.inserted.values())
+
+
+class SeriesCreate(BaseModel):
+    event_name: str
+    dtstart: datetime
+    rule: RecurrenceRule
+
+    @field_validator("dtstart", mode="before")
+    def parse_date(cls, value):
+        if isinstance(value, str):
+            return datetime.strptime(value, "%Y-%m-%d %H:%M")
+        return value
+
+    @field_validator("rule", mode="before")
+    def parse_rule(cls, value):
+        if isinstance(value, str):
+            return RecurrenceRule.parse(value)
+        return value
+
+    @model_validator(mode="after")
+    def check_span(self):
+        # длина серии и переполнение datetime - ошибка проверки, а не add_series
+        self.rule.last_occurrence(self.dtstart)
+        return self
+
+
+class EventSeriesInfo(BaseModel):
+    series_id: int
+    chat_id: str
+    event_name: str
+    dtstart: datetime
+    rule: RecurrenceRule
+    notified_until: datetime | None = None
+
+    def notifications(self, start: datetime, end: datetime) -> list[EventNotofication]:
+        """
+        Неотправленные вхождения в [start, end)
+        """
+        if self.notified_until is not None:
+            start = max(start, self.notified_until + timedelta(microseconds=1))
+        return [
+            EventNotofication(
+                event_id=self.series_id,
+                chat_id=self.chat_id,
+                event_name=self.event_name,
+                event_date=occurrence,
+                series_id=self.series_id,
+            )
+            for occurrence in self.rule.occurrences(self.dtstart, start, end)
+        ]
+
+
+class RejectedLine(BaseModel):
+    line: int
+    error: str
+
+
+class ImportReport(BaseModel):
+    inserted: int = 0
+    rejected_count: int = 0
+    rejected: list[RejectedLine] = []
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.inserted / self.seconds if self.seconds else 0.0
+
+
+class RetentionReport(BaseModel):
+    archived: int = 0
+    batches: int = 0
+    # "event_archive" или путь к gzip JSONL
+    destination: str = ""
+    cutoff: datetime | None = None
+    seconds: float = 0.0
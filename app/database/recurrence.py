@@ -0,0 +1,194 @@
+"""
+Подмножество RRULE (RFC 5545) для повторяющихся событий.
+
+Поддерживаются FREQ=DAILY|WEEKLY, INTERVAL, BYDAY (для WEEKLY), COUNT и
+UNTIL, например "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=20". Вхождения считаются
+арифметически, начиная сразу с нужного окна, без перебора от dtstart.
+
+COUNT, INTERVAL и длина серии ограничены: серия не должна выходить за
+пределы datetime и держать поток базы на расчете последнего вхождения.
+"""
+
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterator
+
+from pydantic import BaseModel, field_validator
+
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+# короткие формы для команд бота
+ALIASES = {"daily": "FREQ=DAILY", "weekly": "FREQ=WEEKLY"}
+
+MAX_COUNT = 10_000
+MAX_INTERVAL = 1000
+# последнее вхождение (по COUNT или UNTIL) не дальше этого от dtstart
+MAX_SPAN = timedelta(days=366 * 50)
+
+
+class RecurrenceRule(BaseModel):
+    freq: str
+    interval: int = 1
+    byday: tuple[int, ...] = ()
+    count: int | None = None
+    until: datetime | None = None
+
+    @field_validator("freq")
+    def check_freq(cls, value):
+        if value not in ("DAILY", "WEEKLY"):
+            raise ValueError(f"Unsupported FREQ: {value}")
+        return value
+
+    @field_validator("interval", "count")
+    def check_positive(cls, value):
+        if value is not None and value < 1:
+            raise ValueError("INTERVAL and COUNT must be positive")
+        return value
+
+    @field_validator("interval")
+    def check_interval(cls, value):
+        if value > MAX_INTERVAL:
+            raise ValueError(f"INTERVAL must be at most {MAX_INTERVAL}")
+        return value
+
+    @field_validator("count")
+    def check_count(cls, value):
+        if value is not None and value > MAX_COUNT:
+            raise ValueError(f"COUNT must be at most {MAX_COUNT}")
+        return value
+
+    @classmethod
+    def parse(cls, text: str) -> "RecurrenceRule":
+        text = ALIASES.get(text.strip().lower(), text.strip())
+        parts = {}
+        for part in text.removeprefix("RRULE:").split(";"):
+            if not part:
+                continue
+            name, sep, value = part.partition("=")
+            if not sep:
+                raise ValueError(f"Invalid RRULE part: {part}")
+            parts[name.strip().upper()] = value.strip().upper()
+
+        byday = ()
+        if "BYDAY" in parts:
+            try:
+                byday = tuple(
+                    sorted({WEEKDAYS.index(day) for day in parts["BYDAY"].split(",")})
+                )
+            except ValueError:
+                raise ValueError(f"Invalid BYDAY: {parts['BYDAY']}")
+
+        until = None
+        if "UNTIL" in parts:
+            until = datetime.strptime(parts["UNTIL"].rstrip("Z"), "%Y%m%dT%H%M%S")
+
+        return cls(
+            freq=parts.get("FREQ", ""),
+            interval=int(parts.get("INTERVAL", 1)),
+            byday=byday,
+            count=int(parts["COUNT"]) if "COUNT" in parts else None,
+            until=until,
+        )
+
+    def to_string(self) -> str:
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.byday:
+            parts.append("BYDAY=" + ",".join(WEEKDAYS[day] for day in self.byday))
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        if self.until is not None:
+            parts.append(f"UNTIL={self.until.strftime('%Y%m%dT%H%M%S')}")
+        return ";".join(parts)
+
+    def _weekly_days(self, dtstart: datetime) -> tuple[int, ...]:
+        return self.byday or (dtstart.weekday(),)
+
+    def _iter_from(self, dtstart: datetime, start: datetime) -> Iterator[datetime]:
+        """
+        Вхождения >= start по порядку, с учетом COUNT, без UNTIL
+        """
+        if self.freq == "DAILY":
+            step = timedelta(days=self.interval)
+            index = 0
+            if start > dtstart:
+                index = -(-(start - dtstart) // step)  # ceil
+            while self.count is None or index < self.count:
+                yield dtstart + index * step
+                index += 1
+            return
+
+        days = self._weekly_days(dtstart)
+        week0 = dtstart - timedelta(days=dtstart.weekday())
+        first = [day for day in days if day >= dtstart.weekday()]
+        step = timedelta(weeks=self.interval)
+
+        period = 0
+        if start > week0:
+            period = max((start - week0) // step - 1, 0)
+        index = 0 if period == 0 else len(first) + (period - 1) * len(days)
+
+        while True:
+            for day in first if period == 0 else days:
+                if self.count is not None and index >= self.count:
+                    return
+                occurrence = week0 + period * step + timedelta(days=day)
+                index += 1
+                if occurrence >= start:
+                    yield occurrence
+            period += 1
+
+    def occurrences(
+        self, dtstart: datetime, start: datetime, end: datetime
+    ) -> Iterator[datetime]:
+        """
+        Вхождения серии в полуинтервале [start, end)
+        """
+        for occurrence in self._iter_from(dtstart, max(start, dtstart)):
+            if occurrence >= end or (self.until and occurrence > self.until):
+                return
+            yield occurrence
+
+    def _nth(self, dtstart: datetime, index: int) -> datetime:
+        """
+        Вхождение с номером index (с 0) без учета UNTIL, за O(1)
+        """
+        if self.freq == "DAILY":
+            return dtstart + index * timedelta(days=self.interval)
+
+        days = self._weekly_days(dtstart)
+        week0 = dtstart - timedelta(days=dtstart.weekday())
+        first = [day for day in days if day >= dtstart.weekday()]
+        if index < len(first):
+            return week0 + timedelta(days=first[index])
+        period, position = divmod(index - len(first), len(days))
+        return (
+            week0
+            + (period + 1) * timedelta(weeks=self.interval)
+            + timedelta(days=days[position])
+        )
+
+    def last_occurrence(self, dtstart: datetime) -> datetime | None:
+        """
+        Верхняя граница серии для фильтра в базе, None - бесконечная.
+        ValueError, если серия длиннее MAX_SPAN или выходит за datetime
+        """
+        last = self.until
+        if self.count is not None:
+            try:
+                by_count = self._nth(dtstart, self.count - 1)
+            except OverflowError:
+                raise ValueError("the series ends after year 9999")
+            last = by_count if last is None else min(last, by_count)
+        if last is not None and last - dtstart > MAX_SPAN:
+            raise ValueError(f"the series must end within {MAX_SPAN.days} days")
+        return last
+
+
+@lru_cache(maxsize=1024)
+def parse_rule(text: str) -> RecurrenceRule:
+    """
+    parse с кэшем: у большинства серий одинаковые правила
+    """
+    return RecurrenceRule.parse(text)
@@ -1,9 +1,45 @@
-from datetime import datetime, timedelta
-from functools import wraps
-from typing import Literal
+import asyncio
+import contextvars
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import partial, wraps
+from itertools import islice
+from typing import Iterable, Literal
 
-from .base import AccountData, Event, Session, db
-from .models import EventCreate, EventNotofication, EventResponse
+from sqlalchemy import Table, delete, func, insert, or_, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.cache import response_cache
+from app.core import config
+from app.metrics import DB_METHOD_SECONDS, UpdateStats, current_update
+
+from .base import (
+    AccountData,
+    Event,
+    EventArchive,
+    EventSeries,
+    LeaderLease,
+    Lesson,
+    SchoolClass,
+    Session,
+    db,
+)
+from .models import (
+    EventCreate,
+    EventNotofication,
+    EventPage,
+    EventResponse,
+    EventSeriesInfo,
+    ImportResult,
+    SeriesCreate,
+)
+from .recurrence import parse_rule
+from .writer import WriteBehind
+
+# ограничение числа параметров в одном IN (...) для SQLite
+IN_CHUNK_SIZE = 500
 
 
 def handle_db_query(func):
@@ -13,50 +49,391 @@ def handle_db_query(func):
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        with db.get_session() as session:
+        with DB_METHOD_SECONDS.time(method=func.__name__), db.get_session() as session:
             try:
                 result = func(session=session, *args, **kwargs)
                 session.commit()
-                return result
             except Exception as e:
                 session.rollback()
                 raise e
+            for callback in session.info.pop("after_commit", []):
+                callback()
+            return result
 
     return wrapper
 
 
+def upsert(table):
+    """
+    INSERT с ON CONFLICT для диалекта текущей базы: у SQLite и Postgres
+    одинаковые on_conflict_do_nothing / on_conflict_do_update
+    """
+    if db.engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def copy_rows(session: Session, table: Table, columns: tuple, rows: list) -> None:
+    """
+    COPY ... FROM STDIN в транзакции сессии (Postgres, psycopg 3 или psycopg2)
+    """
+    sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN"
+    cursor = session.connection().connection.cursor()
+    try:
+        if hasattr(cursor, "copy"):
+            with cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            cursor.copy_expert(sql + " WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def series_in_range(
+    session: Session, start: datetime, end: datetime, user_id: str | None = None
+) -> list[EventSeriesInfo]:
+    """
+    Серии, у которых могут быть вхождения в [start, end)
+    """
+    query = session.query(
+        EventSeries.id,
+        EventSeries.user_id,
+        EventSeries.event_name,
+        EventSeries.dtstart,
+        EventSeries.rule,
+        EventSeries.notified_until,
+    ).filter(
+        EventSeries.dtstart < end,
+        or_(EventSeries.until.is_(None), EventSeries.until >= start),
+    )
+    if user_id is not None:
+        query = query.filter(EventSeries.user_id == user_id)
+    return [
+        EventSeriesInfo(
+            series_id=series_id,
+            chat_id=chat_id,
+            event_name=event_name,
+            dtstart=dtstart,
+            rule=parse_rule(rule),
+            notified_until=notified_until,
+        )
+        for series_id, chat_id, event_name, dtstart, rule, notified_until in query
+    ]
+
+
+def user_event_rows(
+    session: Session, user_id: str, start: datetime, end: datetime
+) -> list[tuple[str, datetime]]:
+    """
+    (event_name, event_date) разовых событий и вхождений серий в [start, end)
+    """
+    rows = session.execute(
+        select(Event.event_name, Event.event_date)
+        .where(
+            Event.user_id == user_id,
+            Event.event_date >= start,
+            Event.event_date < end,
+        )
+        .order_by(Event.event_date)
+    ).all()
+
+    series = series_in_range(session, start, end, user_id=user_id)
+    for item in series:
+        rows.extend(
+            (item.event_name, occurrence)
+            for occurrence in item.rule.occurrences(item.dtstart, start, end)
+        )
+    if series:
+        rows.sort(key=lambda row: row[1])
+    return rows
+
+
+def page_key(event: EventNotofication) -> tuple[datetime, int]:
+    """
+    Ключ курсора страницы: вхождения серий идут с отрицательным id
+    """
+    if event.series_id is None:
+        return event.event_date, event.event_id
+    return event.event_date, -event.series_id
+
+
+def after_commit(session: Session, callback) -> None:
+    """
+    Выполнить callback только после успешного commit сессии
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+def invalidate_responses(session: Session, rows) -> None:
+    changed = {(user_id, event_date) for user_id, event_date in rows if user_id}
+
+    def invalidate():
+        for user_id, event_date in changed:
+            response_cache.invalidate(user_id, event_date)
+
+    if changed:
+        after_commit(session, invalidate)
+
+
 class SQLDataBase:
     def __init__(self):
         pass
 
     @handle_db_query
     def get_events(self, start, end, session: Session) -> list[EventNotofication]:
-        query = (
-            session.query(Event)
-            .filter(
+        # только нужные колонки, без объектов ORM в identity map
+        rows = session.execute(
+            select(Event.id, Event.user_id, Event.event_name, Event.event_date)
+            .where(
                 Event.event_date >= start,
                 Event.event_date <= end,
                 Event.notified == False,
             )
             .order_by(Event.event_date)
-            .all()
         )
-        if query:
-            return [
-                EventNotofication(
-                    event_id=event.id,
-                    chat_id=event.user_id,
-                    event_name=event.event_name,
-                    event_date=event.event_date,
-                )
-                for event in query
-            ]
-        return []
+        events = [
+            EventNotofication(event_id, chat_id, event_name, event_date)
+            for event_id, chat_id, event_name, event_date in rows
+        ]
+
+        # end включительно, как и для разовых событий
+        series_end = end + timedelta(microseconds=1)
+        for series in series_in_range(session, start, series_end):
+            events.extend(series.notifications(start, series_end))
+        events.sort(key=lambda event: event.event_date)
+        return events
 
     @handle_db_query
     def set_event_state(self, event_id: int, session: Session) -> None:
-        event = session.query(Event).filter(Event.id == event_id)
-        event.update({Event.notified: True})
+        rows = session.execute(
+            update(Event)
+            .where(Event.id == event_id)
+            .values(notified=True)
+            .returning(Event.user_id, Event.event_date)
+        )
+        invalidate_responses(session, rows.all())
+
+    @handle_db_query
+    def set_events_state(self, event_ids: list[int], session: Session) -> int:
+        """
+        Помечает события отправленными одним UPDATE на пачку id
+        """
+        changed = []
+        for offset in range(0, len(event_ids), IN_CHUNK_SIZE):
+            chunk = event_ids[offset : offset + IN_CHUNK_SIZE]
+            rows = session.execute(
+                update(Event)
+                .where(Event.id.in_(chunk))
+                .values(notified=True)
+                .returning(Event.user_id, Event.event_date)
+                .execution_options(synchronize_session=False)
+            )
+            changed.extend(rows.all())
+        invalidate_responses(session, changed)
+        return len(changed)
+
+    @handle_db_query
+    def set_series_state(
+        self, watermarks: dict[int, datetime], session: Session = None
+    ) -> None:
+        """
+        Сдвигает notified_until серий: все вхождения до него отправлены
+        """
+        for series_id, occurrence in watermarks.items():
+            session.execute(
+                update(EventSeries)
+                .where(
+                    EventSeries.id == series_id,
+                    or_(
+                        EventSeries.notified_until.is_(None),
+                        EventSeries.notified_until < occurrence,
+                    ),
+                )
+                .values(notified_until=occurrence)
+            )
+
+    @handle_db_query
+    def claim_events(
+        self, events: list[EventNotofication], session: Session = None
+    ) -> list[EventNotofication]:
+        """
+        Атомарно помечает события отправленными и возвращает только те, что
+        пометил этот вызов: событие, уже взятое другой репликой, не вернется.
+
+        Вхождения серии берутся, только если ни одно из них еще не отмечено,
+        notified_until сдвигается на последнее.
+        """
+        event_ids = [event.event_id for event in events if event.series_id is None]
+        claimed: set[tuple] = set()
+        changed = []
+        for offset in range(0, len(event_ids), IN_CHUNK_SIZE):
+            chunk = event_ids[offset : offset + IN_CHUNK_SIZE]
+            rows = session.execute(
+                update(Event)
+                .where(
+                    Event.id.in_(chunk),
+                    # не "notified = 0": по нему SQLite выбирает индекс
+                    # ix_event_notified_date и обходит все неотправленные
+                    # события вместо поиска по id
+                    func.coalesce(Event.notified, True).is_(False),
+                )
+                .values(notified=True)
+                .returning(Event.id, Event.user_id, Event.event_date)
+                .execution_options(synchronize_session=False)
+            ).all()
+            claimed.update(("event", event_id) for event_id, _, _ in rows)
+            changed.extend((user_id, event_date) for _, user_id, event_date in rows)
+        invalidate_responses(session, changed)
+
+        occurrences: dict[int, list[datetime]] = {}
+        for event in events:
+            if event.series_id is not None:
+                occurrences.setdefault(event.series_id, []).append(event.event_date)
+        for series_id, dates in occurrences.items():
+            row = session.execute(
+                update(EventSeries)
+                .where(
+                    EventSeries.id == series_id,
+                    or_(
+                        EventSeries.notified_until.is_(None),
+                        EventSeries.notified_until < min(dates),
+                    ),
+                )
+                .values(notified_until=max(dates))
+                .returning(EventSeries.id)
+            ).first()
+            if row is not None:
+                claimed.update(("series", series_id, day) for day in dates)
+
+        return [event for event in events if event.key in claimed]
+
+    @handle_db_query
+    def release_events(self, event_ids: list[int], session: Session = None) -> None:
+        """
+        Снимает notified с событий, которые так и не удалось отправить
+        """
+        for offset in range(0, len(event_ids), IN_CHUNK_SIZE):
+            session.execute(
+                update(Event)
+                .where(Event.id.in_(event_ids[offset : offset + IN_CHUNK_SIZE]))
+                .values(notified=False)
+                .execution_options(synchronize_session=False)
+            )
+
+    @handle_db_query
+    def get_expired_events(
+        self, cutoff: datetime, notified: bool, limit: int, session: Session = None
+    ) -> list[dict]:
+        """
+        До limit событий раньше cutoff; notified задается явно, чтобы
+        работал индекс ix_event_notified_date
+        """
+        rows = session.execute(
+            select(
+                Event.id,
+                Event.event_name,
+                Event.event_date,
+                Event.user_id,
+                Event.notified,
+            )
+            .where(Event.notified.is_(notified), Event.event_date < cutoff)
+            .order_by(Event.event_date)
+            .limit(limit)
+        )
+        return [dict(row._mapping) for row in rows]
+
+    @handle_db_query
+    def archive_events(
+        self, rows: list[dict], to_table: bool = True, session: Session = None
+    ) -> int:
+        """
+        Удаляет события из event (и копирует их в event_archive при
+        to_table) в одной транзакции. Возвращает число удаленных.
+        """
+        if to_table and rows:
+            archived_at = datetime.now()
+            session.execute(
+                upsert(EventArchive).on_conflict_do_nothing(index_elements=["id"]),
+                [{**row, "archived_at": archived_at} for row in rows],
+            )
+        event_ids = [row["id"] for row in rows]
+        deleted = 0
+        for offset in range(0, len(event_ids), IN_CHUNK_SIZE):
+            deleted += session.execute(
+                delete(Event)
+                .where(Event.id.in_(event_ids[offset : offset + IN_CHUNK_SIZE]))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        return deleted
+
+    def maintain(self, pages: int = config.RETENTION_VACUUM_PAGES) -> None:
+        """
+        Возвращает место после удаления и обновляет статистику планировщика.
+        SQLite: incremental_vacuum (если auto_vacuum=INCREMENTAL) и ANALYZE,
+        Postgres: VACUUM (ANALYZE).
+        """
+        if db.engine.dialect.name == "postgresql":
+            with db.engine.connect() as connection:
+                connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+                for table in ("event", "event_archive"):
+                    connection.execute(text(f"VACUUM (ANALYZE) {table}"))
+            return
+
+        connection = db.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                # execute() делает один шаг pragma (одна страница),
+                # executescript выполняет ее до конца
+                cursor.executescript(f"PRAGMA incremental_vacuum({pages});")
+            cursor.execute("ANALYZE event")
+            cursor.execute("ANALYZE event_archive")
+            cursor.close()
+            connection.commit()
+        finally:
+            connection.close()
+
+    def vacuum(self) -> None:
+        """
+        Полный VACUUM: переписывает файл SQLite и включает auto_vacuum
+        """
+        with db.engine.connect() as connection:
+            connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+            connection.execute(text("VACUUM"))
+
+    @handle_db_query
+    def acquire_lease(
+        self, name: str, holder: str, ttl: float, session: Session = None
+    ) -> bool:
+        """
+        Занимает или продлевает аренду name одним upsert. True - holder
+        держит аренду еще ttl секунд.
+        """
+        now = datetime.now()
+        stmt = upsert(LeaderLease).values(
+            name=name, holder=holder, expires_at=now + timedelta(seconds=ttl)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LeaderLease.name],
+            set_={
+                "holder": stmt.excluded.holder,
+                "expires_at": stmt.excluded.expires_at,
+            },
+            where=or_(LeaderLease.holder == holder, LeaderLease.expires_at < now),
+        ).returning(LeaderLease.holder)
+        return session.execute(stmt).first() is not None
+
+    @handle_db_query
+    def release_lease(self, name: str, holder: str, session: Session = None) -> None:
+        session.execute(
+            update(LeaderLease)
+            .where(LeaderLease.name == name, LeaderLease.holder == holder)
+            .values(expires_at=datetime.now())
+        )
 
     @handle_db_query
     def get_user_events(
@@ -66,35 +443,220 @@ class SQLDataBase:
         end: datetime,
         session: Session = None,
     ) -> list[EventResponse]:
-        query = (
-            session.query(Event)
-            .filter(
-                Event.user_id == user_id,
-                Event.event_date >= start,
-                Event.event_date < end,
+        return [
+            EventResponse(
+                event_name=event_name,
+                event_day=f"{event_date.day}.{event_date.month}",
+                event_time=f"{event_date.hour}:{event_date.minute}",
             )
-            .order_by(Event.event_date)
-            .all()
+            for event_name, event_date in user_event_rows(session, user_id, start, end)
+        ]
+
+    @handle_db_query
+    def get_user_events_page(
+        self,
+        user_id: str,
+        start: datetime,
+        end: datetime,
+        after: tuple[datetime, int] | None = None,
+        limit: int = config.EVENT_PAGE_SIZE,
+        session: Session = None,
+    ) -> EventPage:
+        """
+        События пользователя в [start, end) постранично, после курсора after.
+
+        Разовые события читаются по индексу (user_id, event_date) с позиции
+        курсора, а не через OFFSET, поэтому любая страница стоит как первая.
+        Из каждой серии раскрывается не больше limit + 1 вхождений.
+        """
+        lower = start if after is None else max(start, after[0])
+        query = session.query(Event.id, Event.event_name, Event.event_date).filter(
+            Event.user_id == user_id,
+            Event.event_date >= lower,
+            Event.event_date < end,
         )
-        if query:
-            return [
+        if after is not None:
+            query = query.filter(or_(Event.event_date > after[0], Event.id > after[1]))
+        events = [
+            EventNotofication(
+                event_id=event_id,
+                chat_id=user_id,
+                event_name=event_name,
+                event_date=event_date,
+            )
+            for event_id, event_name, event_date in query.order_by(
+                Event.event_date, Event.id
+            ).limit(limit + 1)
+        ]
+
+        for series in series_in_range(session, lower, end, user_id=user_id):
+            occurrences = (
+                EventNotofication(
+                    event_id=series.series_id,
+                    chat_id=user_id,
+                    event_name=series.event_name,
+                    event_date=occurrence,
+                    series_id=series.series_id,
+                )
+                for occurrence in series.rule.occurrences(series.dtstart, lower, end)
+            )
+            if after is not None:
+                occurrences = (e for e in occurrences if page_key(e) > after)
+            events.extend(islice(occurrences, limit + 1))
+
+        events.sort(key=page_key)
+        if len(events) <= limit:
+            return EventPage(events=events)
+        return EventPage(events=events[:limit], next_cursor=page_key(events[limit - 1]))
+
+    @handle_db_query
+    def get_user_events_grouped(
+        self,
+        user_id: str,
+        start: datetime,
+        end: datetime,
+        session: Session = None,
+    ) -> dict[date, list[EventResponse]]:
+        """
+        События пользователя за весь диапазон одним запросом, по дням
+        """
+        grouped: dict[date, list[EventResponse]] = {}
+        for event_name, event_date in user_event_rows(session, user_id, start, end):
+            grouped.setdefault(event_date.date(), []).append(
                 EventResponse(
-                    event_name=_q.event_name,
-                    event_day=f"{_q.event_date.day}.{_q.event_date.month}",
-                    event_time=f"{_q.event_date.hour}:{_q.event_date.minute}",
+                    event_name=event_name,
+                    event_day=f"{event_date.day}.{event_date.month}",
+                    event_time=f"{event_date.hour}:{event_date.minute}",
                 )
-                for _q in query
-            ]
-        return []
+            )
+        return grouped
 
     @handle_db_query
-    def add_event(self, user_id: str, event: EventCreate, session: Session = None):
+    def add_event(
+        self, user_id: str, event: EventCreate, session: Session = None
+    ) -> EventNotofication:
         db_event = Event(
             user_id=user_id,
             event_name=event.event_name,
             event_date=event.event_date,
         )
         session.add(db_event)
+        session.flush()
+        invalidate_responses(session, [(user_id, db_event.event_date)])
+        return EventNotofication(
+            event_id=db_event.id,
+            chat_id=user_id,
+            event_name=db_event.event_name,
+            event_date=db_event.event_date,
+        )
+
+    @handle_db_query
+    def add_series(
+        self, user_id: str, series: SeriesCreate, session: Session = None
+    ) -> EventSeriesInfo:
+        db_series = EventSeries(
+            user_id=user_id,
+            event_name=series.event_name,
+            dtstart=series.dtstart,
+            rule=series.rule.to_string(),
+            until=series.rule.last_occurrence(series.dtstart),
+        )
+        session.add(db_series)
+        session.flush()
+        # серия затрагивает много дат - сбрасываем все ответы чата
+        after_commit(session, lambda: response_cache.invalidate_chat(user_id))
+        return EventSeriesInfo(
+            series_id=db_series.id,
+            chat_id=user_id,
+            event_name=series.event_name,
+            dtstart=series.dtstart,
+            rule=series.rule,
+        )
+
+    @handle_db_query
+    def import_events(
+        self,
+        rows: Iterable[tuple[str, EventCreate]],
+        batch_size: int = config.IMPORT_BATCH_SIZE,
+        due_until: datetime | None = None,
+        session: Session = None,
+    ) -> ImportResult:
+        """
+        Пачечная вставка (chat_id, EventCreate) в одной транзакции (в
+        Postgres - через COPY), недостающие аккаунты создаются. События с
+        датой до due_until вставляются отдельно с RETURNING и возвращаются
+        в ImportResult.due - для очереди напоминаний без перечитывания окна.
+        """
+        result = ImportResult(inserted={}, due=[])
+        changed = set()
+        now = datetime.now()
+        rows = iter(rows)
+        while batch := list(islice(rows, batch_size)):
+            chat_ids = {chat_id for chat_id, _ in batch}
+            session.execute(
+                upsert(AccountData.__table__).on_conflict_do_nothing(
+                    index_elements=["chat_id"]
+                ),
+                [{"chat_id": chat_id} for chat_id in chat_ids],
+            )
+            due, rest = [], batch
+            if due_until is not None:
+                due = [row for row in batch if now <= row[1].event_date <= due_until]
+                rest = [
+                    row for row in batch if not now <= row[1].event_date <= due_until
+                ]
+            if due:
+                created = session.execute(
+                    insert(Event.__table__).returning(
+                        Event.id, Event.user_id, Event.event_name, Event.event_date
+                    ),
+                    [
+                        {
+                            "user_id": chat_id,
+                            "event_name": event.event_name,
+                            "event_date": event.event_date,
+                            "notified": False,
+                        }
+                        for chat_id, event in due
+                    ],
+                )
+                result.due.extend(
+                    EventNotofication(
+                        event_id=row.id,
+                        chat_id=row.user_id,
+                        event_name=row.event_name,
+                        event_date=row.event_date,
+                    )
+                    for row in created
+                )
+            if rest and db.engine.dialect.name == "postgresql":
+                copy_rows(
+                    session,
+                    Event.__table__,
+                    ("user_id", "event_name", "event_date", "notified"),
+                    [
+                        (chat_id, event.event_name, event.event_date, False)
+                        for chat_id, event in rest
+                    ],
+                )
+            elif rest:
+                session.execute(
+                    insert(Event.__table__),
+                    [
+                        {
+                            "user_id": chat_id,
+                            "event_name": event.event_name,
+                            "event_date": event.event_date,
+                            "notified": False,
+                        }
+                        for chat_id, event in rest
+                    ],
+                )
+            for chat_id, event in batch:
+                result.inserted[chat_id] = result.inserted.get(chat_id, 0) + 1
+                changed.add((chat_id, event.event_date))
+        invalidate_responses(session, changed)
+        return result
 
     @handle_db_query
     def get_notification(self, session: Session):
@@ -105,6 +667,131 @@ class SQLDataBase:
         new_account = AccountData(chat_id=user_id)
         session.add(new_account)
 
+    @handle_db_query
+    def ensure_account(self, user_id: str, session: Session = None) -> None:
+        """
+        INSERT ... ON CONFLICT DO NOTHING: не падает, если аккаунт уже есть
+        """
+        session.execute(
+            upsert(AccountData)
+            .values(chat_id=user_id)
+            .on_conflict_do_nothing(index_elements=[AccountData.chat_id])
+        )
+
+    @handle_db_query
+    def get_account_ids(self, limit: int | None = None, session: Session = None):
+        query = session.query(AccountData.chat_id).order_by(AccountData.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return [chat_id for (chat_id,) in query]
+
+    @handle_db_query
+    def get_class_lessons(
+        self, class_id: int, session: Session = None
+    ) -> list[tuple[int, str, str]]:
+        """
+        Уроки класса (weekday, lesson, time) по порядку
+        """
+        rows = (
+            session.query(Lesson.weekday, Lesson.lesson, Lesson.time)
+            .filter(Lesson.class_id == class_id)
+            .order_by(Lesson.weekday, Lesson.position)
+            .all()
+        )
+        return [tuple(row) for row in rows]
+
+    @handle_db_query
+    def get_class_versions(
+        self, class_ids: list[int], session: Session = None
+    ) -> dict[int, int]:
+        """
+        Версии расписаний классов, 0 - расписание не перезаписывалось
+        """
+        versions = {}
+        for offset in range(0, len(class_ids), IN_CHUNK_SIZE):
+            chunk = class_ids[offset : offset + IN_CHUNK_SIZE]
+            versions.update(
+                session.execute(
+                    select(SchoolClass.id, func.coalesce(SchoolClass.version, 0)).where(
+                        SchoolClass.id.in_(chunk)
+                    )
+                ).all()
+            )
+        return versions
+
+    @handle_db_query
+    def save_class_timetable(
+        self,
+        class_name: str,
+        lessons: dict[int, list[tuple[str, str]]],
+        session: Session = None,
+    ) -> int:
+        """
+        Создает класс при необходимости и полностью заменяет его расписание
+        """
+        school_class = (
+            session.query(SchoolClass)
+            .filter(SchoolClass.name == class_name)
+            .one_or_none()
+        )
+        if school_class is None:
+            school_class = SchoolClass(name=class_name)
+            session.add(school_class)
+            session.flush()
+
+        session.query(Lesson).filter(Lesson.class_id == school_class.id).delete()
+        rows = [
+            {
+                "class_id": school_class.id,
+                "weekday": weekday,
+                "position": position,
+                "lesson": lesson,
+                "time": time,
+            }
+            for weekday, items in lessons.items()
+            for position, (lesson, time) in enumerate(items)
+        ]
+        if rows:
+            session.execute(insert(Lesson.__table__), rows)
+        # процессы бота сверяют версию и перечитывают расписание класса
+        school_class.version = func.coalesce(SchoolClass.version, 0) + 1
+        return school_class.id
+
+    @handle_db_query
+    def get_user_class(
+        self, user_id: str, session: Session = None
+    ) -> tuple[int, str] | None:
+        row = (
+            session.query(SchoolClass.id, SchoolClass.name)
+            .join(AccountData, AccountData.class_id == SchoolClass.id)
+            .filter(AccountData.chat_id == user_id)
+            .one_or_none()
+        )
+        return tuple(row) if row else None
+
+    @handle_db_query
+    def set_user_class(
+        self, user_id: str, class_name: str, session: Session = None
+    ) -> int | None:
+        """
+        Привязывает пользователя к классу, None - такого класса нет
+        """
+        class_id = (
+            session.query(SchoolClass.id)
+            .filter(SchoolClass.name == class_name)
+            .scalar()
+        )
+        if class_id is None:
+            return None
+        session.execute(
+            upsert(AccountData.__table__)
+            .values(chat_id=user_id, class_id=class_id)
+            .on_conflict_do_update(
+                index_elements=["chat_id"], set_={"class_id": class_id}
+            )
+        )
+        return class_id
+
     @handle_db_query
     def account_exists(self, user_id: str, session: Session = None):
         account = (
@@ -115,3 +802,208 @@ class SQLDataBase:
         if account:
             return True
         return False
+
+    @handle_db_query
+    def write_batch(
+        self,
+        operations: list[tuple[str, tuple, UpdateStats | None]],
+        session: Session = None,
+    ):
+        """
+        Несколько записей одной транзакцией (WriteBehind): тела методов из
+        BATCH_WRITES выполняются в общей сессии, результаты - по порядку.
+        Запросы каждой записи засчитываются ее апдейту
+        """
+        results = []
+        for operation, args, stats in operations:
+            if operation not in BATCH_WRITES:
+                raise ValueError(f"{operation} is not a batch write")
+            method = getattr(SQLDataBase, operation).__wrapped__
+            token = current_update.set(stats)
+            try:
+                results.append(method(self, *args, session=session))
+            finally:
+                current_update.reset(token)
+        return results
+
+
+# записи, которые AsyncSQLDataBase отправляет через буфер WriteBehind
+BATCH_WRITES = frozenset(
+    {
+        "add_event",
+        "add_account",
+        "ensure_account",
+        "set_event_state",
+        "set_events_state",
+    }
+)
+
+
+class AsyncSQLDataBase:
+    """
+    Асинхронный вариант SQLDataBase для хендлеров aiogram.
+
+    Синхронные запросы выполняются в ограниченном пуле потоков, поэтому
+    медленный запрос одного чата не блокирует event loop диспетчера.
+    """
+
+    def __init__(
+        self,
+        database: SQLDataBase | None = None,
+        max_workers: int = config.DB_EXECUTOR_WORKERS,
+        event_cache=None,
+    ):
+        self.sync = database or SQLDataBase()
+        # необязательный кэш чтения событий пользователя (app.storage)
+        self.event_cache = event_cache
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="db"
+        )
+        # None - каждая запись своей транзакцией
+        self.writer = None
+        if config.WRITE_BATCH_ROWS > 1:
+            self.writer = WriteBehind(partial(self._run, self.sync.write_batch))
+
+    async def _write(self, operation: str, *args):
+        """
+        Запись через буфер; возвращается после commit
+        """
+        if self.writer is None:
+            return await self._run(getattr(self.sync, operation), *args)
+        return await self.writer.write(operation, *args)
+
+    async def _run(self, func, /, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # contextvars (счетчик запросов текущего апдейта) не переходят в
+        # поток пула сами
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, context.run, partial(func, *args, **kwargs)
+        )
+
+    async def get_events(self, start, end) -> list[EventNotofication]:
+        return await self._run(self.sync.get_events, start=start, end=end)
+
+    async def set_event_state(self, event_id: int) -> None:
+        return await self._write("set_event_state", event_id)
+
+    async def set_events_state(self, event_ids: list[int]) -> int:
+        return await self._write("set_events_state", event_ids)
+
+    async def get_user_events(
+        self, user_id: str, start: datetime, end: datetime
+    ) -> list[EventResponse]:
+        if self.event_cache is not None:
+            events = await self.event_cache.get_events(user_id, start, end)
+            if events is not None:
+                return events
+
+        events = await self._run(self.sync.get_user_events, user_id, start, end)
+        if self.event_cache is not None:
+            await self.event_cache.set_events(user_id, start, end, events)
+        return events
+
+    async def get_user_events_page(
+        self,
+        user_id: str,
+        start: datetime,
+        end: datetime,
+        after: tuple[datetime, int] | None = None,
+        limit: int = config.EVENT_PAGE_SIZE,
+    ) -> EventPage:
+        return await self._run(
+            self.sync.get_user_events_page, user_id, start, end, after, limit
+        )
+
+    async def get_user_events_grouped(
+        self, user_id: str, start: datetime, end: datetime
+    ) -> dict[date, list[EventResponse]]:
+        if self.event_cache is not None:
+            grouped = await self.event_cache.get_grouped(user_id, start, end)
+            if grouped is not None:
+                return grouped
+
+        grouped = await self._run(
+            self.sync.get_user_events_grouped, user_id, start, end
+        )
+        if self.event_cache is not None:
+            await self.event_cache.set_grouped(user_id, start, end, grouped)
+        return grouped
+
+    async def set_series_state(self, watermarks: dict[int, datetime]) -> None:
+        return await self._run(self.sync.set_series_state, watermarks=watermarks)
+
+    async def claim_events(
+        self, events: list[EventNotofication]
+    ) -> list[EventNotofication]:
+        return await self._run(self.sync.claim_events, events=events)
+
+    async def release_events(self, event_ids: list[int]) -> None:
+        return await self._run(self.sync.release_events, event_ids=event_ids)
+
+    async def acquire_lease(self, name: str, holder: str, ttl: float) -> bool:
+        return await self._run(
+            self.sync.acquire_lease, name=name, holder=holder, ttl=ttl
+        )
+
+    async def release_lease(self, name: str, holder: str) -> None:
+        return await self._run(self.sync.release_lease, name=name, holder=holder)
+
+    async def add_series(self, user_id: str, series: SeriesCreate) -> EventSeriesInfo:
+        result = await self._run(self.sync.add_series, user_id, series)
+        if self.event_cache is not None:
+            await self.event_cache.invalidate(user_id)
+        return result
+
+    async def add_event(self, user_id: str, event: EventCreate) -> EventNotofication:
+        result = await self._write("add_event", user_id, event)
+        if self.event_cache is not None:
+            await self.event_cache.invalidate(user_id)
+        return result
+
+    async def import_events(
+        self,
+        rows: Iterable[tuple[str, EventCreate]],
+        batch_size: int = config.IMPORT_BATCH_SIZE,
+        due_until: datetime | None = None,
+    ) -> ImportResult:
+        result = await self._run(
+            self.sync.import_events, rows, batch_size=batch_size, due_until=due_until
+        )
+        if self.event_cache is not None:
+            for chat_id in result.inserted:
+                await self.event_cache.invalidate(chat_id)
+        return result
+
+    async def add_account(self, user_id: str):
+        return await self._write("add_account", user_id)
+
+    async def ensure_account(self, user_id: str) -> None:
+        return await self._write("ensure_account", user_id)
+
+    async def get_account_ids(self, limit: int | None = None) -> list[str]:
+        return await self._run(self.sync.get_account_ids, limit=limit)
+
+    async def get_class_lessons(self, class_id: int) -> list[tuple[int, str, str]]:
+        return await self._run(self.sync.get_class_lessons, class_id=class_id)
+
+    async def get_class_versions(self, class_ids: list[int]) -> dict[int, int]:
+        return await self._run(self.sync.get_class_versions, class_ids=class_ids)
+
+    async def get_user_class(self, user_id: str) -> tuple[int, str] | None:
+        return await self._run(self.sync.get_user_class, user_id=user_id)
+
+    async def set_user_class(self, user_id: str, class_name: str) -> int | None:
+        return await self._run(
+            self.sync.set_user_class, user_id=user_id, class_name=class_name
+        )
+
+    async def account_exists(self, user_id: str) -> bool:
+        return await self._run(self.sync.account_exists, user_id=user_id)
+
+    async def drain(self) -> None:
+        if self.writer is not None:
+            await self.writer.drain()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
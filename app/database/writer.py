@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+from app.core import config
+from app.metrics import WRITE_BATCH_ROWS, UpdateStats, current_update
+
+# (метод SQLDataBase, аргументы, статистика апдейта, который поставил запись)
+Operation = tuple[str, tuple, UpdateStats | None]
+
+
+class WriteBehind:
+    """
+    Буфер записи с групповой фиксацией.
+
+    Записи из разных хендлеров копятся и уходят в базу одной транзакцией
+    (в SQLite - один fsync на пачку): пачка закрывается через delay секунд
+    после первой записи или при max_rows записях, а пока идет фиксация,
+    копится следующая. Future каждой записи завершается только после
+    commit, поэтому await write(...) означает, что транзакция с записью
+    зафиксирована. Переживет ли она сбой питания, решает SQLITE_SYNCHRONOUS:
+    при NORMAL в режиме WAL последние транзакции могут пропасть, при FULL нет.
+
+    Фоновая задача наследует contextvars первого писателя, поэтому
+    current_update в ней сбрасывается, а SQL-запросы каждой записи
+    засчитываются апдейту, который ее поставил (SQLDataBase.write_batch).
+
+    Если пачка не прошла (например, нарушено ограничение в одной строке),
+    записи повторяются по одной, и ошибку получает только виновная.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[list[Operation]], Awaitable[list[Any]]],
+        delay: float = config.WRITE_BATCH_MS / 1000,
+        max_rows: int = config.WRITE_BATCH_ROWS,
+    ):
+        self.write_batch = write_batch
+        self.delay = delay
+        self.max_rows = max_rows
+        self._pending: list[tuple[Operation, asyncio.Future]] = []
+        self._in_flight: list[asyncio.Future] = []
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def write(self, operation: str, *args) -> asyncio.Future:
+        """
+        Ставит запись в очередь; future - результат метода SQLDataBase
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(((operation, args, current_update.get()), future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        if len(self._pending) >= self.max_rows:
+            self._full.set()
+        self._wakeup.set()
+        return future
+
+    async def _run(self) -> None:
+        current_update.set(None)
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if len(self._pending) < self.max_rows:
+                if self.delay:
+                    try:
+                        await asyncio.wait_for(self._full.wait(), self.delay)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    # дать записать всем, кто уже готов в этой итерации loop
+                    await asyncio.sleep(0)
+            self._full.clear()
+
+            batch = self._pending[: self.max_rows]
+            del self._pending[: self.max_rows]
+            if self._pending:
+                self._wakeup.set()
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[tuple[Operation, asyncio.Future]]) -> None:
+        operations = [operation for operation, _ in batch]
+        self._in_flight = [future for _, future in batch]
+        try:
+            results = await self.write_batch(operations)
+        except Exception as e:
+            logging.warning(f"write batch of {len(batch)} failed, retrying: {e}")
+            results = []
+            for operation in operations:
+                try:
+                    results.extend(await self.write_batch([operation]))
+                except Exception as error:
+                    results.append(error)
+        WRITE_BATCH_ROWS.observe(len(batch))
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def drain(self) -> None:
+        """
+        Дожидается фиксации всего накопленного и останавливает фоновую задачу
+        """
+        waiting = self._in_flight + [future for _, future in self._pending]
+        # не ждать delay: пачки уходят сразу
+        self._full.set()
+        self._wakeup.set()
+        if waiting:
+            await asyncio.gather(*waiting, return_exceptions=True)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from .core import config
+from .database import AsyncSQLDataBase
+from .database.models import EventNotofication
+from .metrics import REMINDER_LAG_SECONDS, REMINDERS_SENT
+
+
+class TokenBucket:
+    """
+    rate токенов в секунду, не больше capacity накопленных
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self._tokens >= self.capacity
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class ReminderDelivery:
+    """
+    Конкурентная отправка пачки напоминаний.
+
+    Пул воркеров ограничен workers, отправка идет через общий и поканальный
+    token bucket (лимиты Telegram), при RetryAfter все воркеры ждут
+    указанное время. Перед отправкой события забираются одним
+    UPDATE ... RETURNING, поэтому несколько реплик не отправят одно
+    напоминание дважды; неотправленные события возвращаются.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        database: AsyncSQLDataBase,
+        workers: int = config.DELIVERY_WORKERS,
+        global_rate: float = config.DELIVERY_GLOBAL_RATE,
+        chat_rate: float = config.DELIVERY_CHAT_RATE,
+        max_retries: int = config.DELIVERY_MAX_RETRIES,
+        lead: timedelta = timedelta(minutes=config.REMINDER_LEAD_MINUTES),
+    ):
+        self.bot = bot
+        self.database = database
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+        # для метрики задержки: напоминание должно уйти за lead до события
+        self.lead = lead
+
+        self._global = TokenBucket(global_rate)
+        self._chats: dict[str, TokenBucket] = {}
+        self._paused_until = 0.0
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, 1.0)
+        return bucket
+
+    async def _wait_pause(self) -> None:
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _send(self, event: EventNotofication, text: str) -> bool:
+        for attempt in range(self.max_retries + 1):
+            await self._wait_pause()
+            await self._chat_bucket(event.chat_id).acquire()
+            await self._global.acquire()
+            try:
+                await self.bot.send_message(event.chat_id, text)
+                scheduled = event.event_date - self.lead
+                REMINDER_LAG_SECONDS.observe(
+                    (datetime.now() - scheduled).total_seconds()
+                )
+                return True
+            except TelegramRetryAfter as e:
+                logging.warning(
+                    f"delivery: retry after {e.retry_after}s "
+                    f"(event {event.event_id}, attempt {attempt + 1})"
+                )
+                self._paused_until = max(
+                    self._paused_until, time.monotonic() + e.retry_after
+                )
+            except Exception as e:
+                logging.log(level=logging.ERROR, msg=f"{e}")
+                return False
+        return False
+
+    async def _worker(
+        self,
+        queue: asyncio.Queue,
+        render: Callable[[EventNotofication], str],
+        delivered: list[EventNotofication],
+    ) -> None:
+        while True:
+            event = await queue.get()
+            try:
+                if await self._send(event, render(event)):
+                    delivered.append(event)
+                    REMINDERS_SENT.inc(result="sent")
+                else:
+                    REMINDERS_SENT.inc(result="failed")
+            finally:
+                queue.task_done()
+
+    async def deliver(
+        self,
+        events: list[EventNotofication],
+        render: Callable[[EventNotofication], str],
+    ) -> list[EventNotofication]:
+        # забираем события до отправки: взятые другой репликой пропускаем
+        claimed = await self.database.claim_events(events)
+        if len(claimed) < len(events):
+            REMINDERS_SENT.inc(len(events) - len(claimed), result="skipped")
+        events = claimed
+        if not events:
+            return []
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in events:
+            queue.put_nowait(event)
+
+        delivered: list[EventNotofication] = []
+        tasks = [
+            asyncio.create_task(self._worker(queue, render, delivered))
+            for _ in range(min(self.workers, len(events)))
+        ]
+        try:
+            await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        sent = {event.key for event in delivered}
+        failed = [
+            event.event_id
+            for event in events
+            if event.series_id is None and event.key not in sent
+        ]
+        if failed:
+            # вернутся в очередь при следующем сканировании
+            await self.database.release_events(failed)
+
+        # освобождаем бакеты чатов, которые уже восстановились
+        self._chats = {
+            chat_id: bucket
+            for chat_id, bucket in self._chats.items()
+            if not bucket.full
+        }
+        return delivered
@@ -1,66 +1,132 @@
 from datetime import datetime, timedelta
 
-import gradio as gr
-
-from .database import Event, EventCreate, get_database
+from .core import config
+from .database import Event, EventCreate, get_async_database
 from .helper import get_schedule, get_time_range
 
-database = get_database()
+database = get_async_database()
+# ReminderEngine процесса (app.telebot), задается в main; None - без напоминаний
+reminders = None
 
 
-def gradio_add_event(user_id: str, event_name: str, event_date: str):
+async def gradio_add_event(user_id: str, event_name: str, event_date: str):
     try:
         event_date_dt = datetime.strptime(event_date, "%Y-%m-%d %H:%M")
         event = EventCreate(event_name=event_name, event_date=event_date_dt)
 
-        database.add_event(user_id=user_id, event=event)
+        added = await database.add_event(user_id=user_id, event=event)
+        if reminders is not None:
+            reminders.add(added)
 
         return f"Event added: {event_name} at {event_date}"
     except ValueError:
         return "Invalid date format. Use YYYY-MM-DD HH:MM"
 
 
-def gradio_get_schedule(user_id: str, period: str):
+async def gradio_get_schedule(
+    user_id: str, period: str, cursor: tuple | None = None, page: int = 0
+):
+    """
+    Одна страница событий пользователя; cursor и page хранятся в gr.State,
+    None - первая страница
+    """
     start, end = get_time_range(period)
+    if cursor is None:
+        page = 0
 
-    events = database.get_events(start=start, end=end)
+    result = await database.get_user_events_page(user_id, start, end, after=cursor)
 
-    if not events:
-        return [], "No events found"
+    if not result.events:
+        return [], "No events found", None, 0
 
     event_data = [
-        [e.event_name, e.event_date.strftime("%Y-%m-%d %H:%M")] for e in events
+        [e.event_name, e.event_date.strftime("%Y-%m-%d %H:%M")] for e in result.events
     ]
-    return event_data, f"Found {len(events)} events"
-
-
-with gr.Blocks(title="Student Schedule Manager") as gradio_app:
-    gr.Markdown("# Student Schedule Manager")
-
-    with gr.Tab("View Schedule"):
-        user_id_input = gr.Textbox(label="User ID")
-        period_input = gr.Dropdown(
-            label="Period", choices=["today", "tomorrow", "week"], value="today"
-        )
-        view_button = gr.Button("View Schedule")
-        schedule_output = gr.Dataframe(headers=["Event", "Date"], label="Schedule")
-        status_output = gr.Textbox(label="Status")
-        view_button.click(
-            fn=gradio_get_schedule,
-            inputs=[user_id_input, period_input],
-            outputs=[schedule_output, status_output],
-        )
-
-    with gr.Tab("Add Event"):
-        add_user_id_input = gr.Textbox(label="User ID")
-        event_name_input = gr.Textbox(label="Event Name")
-        event_date_input = gr.Textbox(
-            label="Event Date (YYYY-MM-DD HH:MM)", placeholder="2023-12-31 14:30"
-        )
-        add_button = gr.Button("Add Event")
-        add_result_output = gr.Textbox(label="Result")
-        add_button.click(
-            fn=gradio_add_event,
-            inputs=[add_user_id_input, event_name_input, event_date_input],
-            outputs=add_result_output,
-        )
+    first = page * config.EVENT_PAGE_SIZE + 1
+    status = f"Events {first}-{first + len(result.events) - 1}"
+    if result.next_cursor is not None:
+        status += ", more on the next page"
+    return event_data, status, result.next_cursor, page + 1
+
+
+def build_gradio_app():
+    """
+    Собирает интерфейс; gradio импортируется только здесь, поэтому импорт
+    модуля не тянет его в режиме telegram
+    """
+    import gradio as gr
+
+    with gr.Blocks(title="Student Schedule Manager") as gradio_app:
+        gr.Markdown("# Student Schedule Manager")
+
+        with gr.Tab("View Schedule"):
+            user_id_input = gr.Textbox(label="User ID")
+            period_input = gr.Dropdown(
+                label="Period", choices=["today", "tomorrow", "week"], value="today"
+            )
+            view_button = gr.Button("View Schedule")
+            schedule_output = gr.Dataframe(headers=["Event", "Date"], label="Schedule")
+            status_output = gr.Textbox(label="Status")
+            next_button = gr.Button("Next page", interactive=False)
+            # курсор следующей страницы и номер показанной, на сервере
+            cursor_state = gr.State(None)
+            page_state = gr.State(0)
+            page_outputs = [schedule_output, status_output, cursor_state, page_state]
+
+            def toggle_next(cursor):
+                return gr.Button(interactive=cursor is not None)
+
+            view_button.click(
+                fn=gradio_get_schedule,
+                inputs=[user_id_input, period_input],
+                outputs=page_outputs,
+                api_name="schedule",
+            ).then(toggle_next, cursor_state, next_button, queue=False)
+            next_button.click(
+                fn=gradio_get_schedule,
+                inputs=[user_id_input, period_input, cursor_state, page_state],
+                outputs=page_outputs,
+                api_name="schedule_page",
+            ).then(toggle_next, cursor_state, next_button, queue=False)
+
+        with gr.Tab("Add Event"):
+            add_user_id_input = gr.Textbox(label="User ID")
+            event_name_input = gr.Textbox(label="Event Name")
+            event_date_input = gr.Textbox(
+                label="Event Date (YYYY-MM-DD HH:MM)", placeholder="2023-12-31 14:30"
+            )
+            add_button = gr.Button("Add Event")
+            add_result_output = gr.Textbox(label="Result")
+            add_button.click(
+                fn=gradio_add_event,
+                inputs=[add_user_id_input, event_name_input, event_date_input],
+                outputs=add_result_output,
+                api_name="add_event",
+            )
+
+    return gradio_app
+
+
+async def serve_gradio(
+    host: str = config.GRADIO_HOST, port: int = config.GRADIO_PORT
+) -> None:
+    """
+    Отдает интерфейс через uvicorn в текущем event loop, до SIGINT/SIGTERM.
+
+    Хендлеры асинхронные и ждут базу в пуле AsyncSQLDataBase, очередь gradio
+    выполняет не больше GRADIO_CONCURRENCY запросов одновременно и держит не
+    больше GRADIO_QUEUE_SIZE ожидающих.
+    """
+    import gradio as gr
+    import uvicorn
+    from fastapi import FastAPI
+
+    gradio_app = build_gradio_app().queue(
+        default_concurrency_limit=config.GRADIO_CONCURRENCY,
+        max_size=config.GRADIO_QUEUE_SIZE,
+    )
+    app = gr.mount_gradio_app(FastAPI(), gradio_app, path="/")
+    server = uvicorn.Server(
+        uvicorn.Config(app, host=host, port=port, log_level="warning")
+    )
+    await server.serve()
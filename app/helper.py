@@ -1,4 +1,5 @@
 import json
+import logging
 import os
 from datetime import datetime, timedelta
 from typing import List
@@ -38,13 +39,6 @@ class ScheduleItem(BaseModel):
     time: str
 
 
-with open(os.path.join("app", "schedule.json"), "r", encoding="utf-8") as file:
-    schedule = json.load(file)
-
-schedule: dict[str, list[ScheduleItem]] = {
-    key: [ScheduleItem(**t) for t in item] for key, item in schedule.items()
-}
-
 weekday_map = {
     "0": "Понедельник",
     "1": "Вторник",
@@ -55,14 +49,86 @@ weekday_map = {
 }
 
 
-def get_schedule(date, day: str) -> str | None:
-    weekday = weekday_map.get(day)
-    if weekday:
+def render_timetable(schedule: dict[str, list[ScheduleItem]]) -> dict[str, str]:
+    """
+    Текст расписания по дням недели без заголовка с датой
+    """
+    rendered = {}
+    for day, items in schedule.items():
+        weekday = weekday_map.get(day)
+        if weekday is None:
+            continue
         text = "\n".join(
             [
                 f"  {idx + 1}. {item.lesson}\t{item.time}"
-                for idx, item in enumerate(schedule[day])
+                for idx, item in enumerate(items)
             ]
         )
-        return f"Расписание на {date} [{weekday}]:\n\n" + text + "\n"
+        rendered[day] = f" [{weekday}]:\n\n" + text + "\n"
+    return rendered
+
+
+class TimetableCache:
+    """
+    Отрендеренное расписание по дням недели.
+
+    Текст строится один раз при загрузке и перестраивается, только когда
+    меняется mtime файла, поэтому новое расписание подхватывается без
+    перезапуска.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: int | None = None
+        self._rendered: dict[str, str] = {}
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as file:
+            raw = json.load(file)
+
+        schedule: dict[str, list[ScheduleItem]] = {
+            key: [ScheduleItem(**t) for t in item] for key, item in raw.items()
+        }
+        self._rendered = render_timetable(schedule)
+
+    def refresh(self) -> int | None:
+        """
+        Перечитывает файл при изменении mtime, возвращает текущую версию
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            # файл подменяют во время деплоя - отдаем предыдущую версию
+            mtime = self._mtime
+        if mtime != self._mtime:
+            try:
+                self._load()
+                self._mtime = mtime
+            except (OSError, ValueError) as e:
+                # недописанный файл: оставляем старое расписание до следующей попытки
+                if not self._rendered:
+                    raise
+                logging.error(f"schedule reload failed: {e}")
+        return self._mtime
+
+    def get(self, day: str) -> str | None:
+        self.refresh()
+        return self._rendered.get(day)
+
+
+# рядом с модулем, а не относительно текущего каталога процесса
+timetable = TimetableCache(os.path.join(os.path.dirname(__file__), "schedule.json"))
+
+
+def get_schedule(date, day: str, lessons: dict[str, str] | None = None) -> str | None:
+    """
+    lessons - отрендеренное расписание класса, по умолчанию общее из schedule.json
+    """
+    rendered = timetable.get(day) if lessons is None else lessons.get(day)
+    if rendered:
+        return f"Расписание на {date}" + rendered
+    weekday = weekday_map.get(day)
+    if weekday:
+        # в расписании класса нет этого дня
+        return f"Расписание на {date} [{weekday}]:\n\n  Уроков нет\n"
     return None
@@ -0,0 +1,165 @@
+"""
+Массовый импорт событий из CSV или JSONL.
+
+Каждая строка содержит chat_id (или user_id), event_name и event_date
+в формате YYYY-MM-DD HH:MM. Файл читается потоково, строки проверяются
+через EventCreate, недостающие аккаунты создаются, а события вставляются
+пачками по IMPORT_BATCH_SIZE в одной транзакции.
+
+    python -m app.importer events.csv
+    python -m app.importer events.jsonl --chat-id 12345
+"""
+
+import argparse
+import csv
+import json
+import time
+from typing import IO, Iterator
+
+from pydantic import ValidationError
+
+from .core import config
+from .database import EventCreate, SQLDataBase
+from .database.models import ImportReport, RejectedLine
+
+# сколько отклоненных строк хранить в отчете
+MAX_REJECTED = 1000
+
+
+def detect_format(filename: str) -> str:
+    return "csv" if filename.lower().endswith(".csv") else "jsonl"
+
+
+def _error_text(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        first = error.errors()[0]
+        field = ".".join(str(loc) for loc in first["loc"])
+        return f"{field}: {first['msg']}" if field else first["msg"]
+    return str(error)
+
+
+class EventImport:
+    """
+    Итератор проверенных строк (chat_id, EventCreate) из потока.
+
+    Ошибочные строки не прерывают импорт и попадают в rejected. Если задан
+    allowed_chat_id, строки с другим chat_id тоже отклоняются.
+    """
+
+    def __init__(
+        self,
+        stream: IO[str],
+        fmt: str,
+        default_chat_id: str | None = None,
+        allowed_chat_id: str | None = None,
+    ):
+        if fmt not in ("csv", "jsonl"):
+            raise ValueError(f"Unknown import format: {fmt}")
+        self.stream = stream
+        self.fmt = fmt
+        self.default_chat_id = default_chat_id
+        self.allowed_chat_id = allowed_chat_id
+        self.rejected: list[RejectedLine] = []
+        self.rejected_count = 0
+
+    def _records(self) -> Iterator[tuple[int, object]]:
+        if self.fmt == "csv":
+            reader = csv.DictReader(self.stream)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_no, line in enumerate(self.stream, 1):
+                if line.strip():
+                    yield line_no, line
+
+    def _reject(self, line_no: int, error: Exception) -> None:
+        self.rejected_count += 1
+        if len(self.rejected) < MAX_REJECTED:
+            self.rejected.append(RejectedLine(line=line_no, error=_error_text(error)))
+
+    def __iter__(self) -> Iterator[tuple[str, EventCreate]]:
+        for line_no, record in self._records():
+            try:
+                if isinstance(record, str):
+                    record = json.loads(record)
+                if not isinstance(record, dict):
+                    raise ValueError("expected an object")
+
+                chat_id = str(
+                    record.get("chat_id")
+                    or record.get("user_id")
+                    or self.default_chat_id
+                    or ""
+                ).strip()
+                if not chat_id:
+                    raise ValueError("chat_id is required")
+                if self.allowed_chat_id is not None and chat_id != self.allowed_chat_id:
+                    raise ValueError(f"chat_id {chat_id}: only this chat is allowed")
+
+                event = EventCreate(
+                    event_name=record.get("event_name"),
+                    event_date=record.get("event_date"),
+                )
+            except ValueError as e:
+                self._reject(line_no, e)
+                continue
+            yield chat_id, event
+
+    def report(self, inserted: int, seconds: float) -> ImportReport:
+        return ImportReport(
+            inserted=inserted,
+            rejected_count=self.rejected_count,
+            rejected=self.rejected,
+            seconds=seconds,
+        )
+
+
+def import_events(
+    database: SQLDataBase,
+    stream: IO[str],
+    fmt: str,
+    default_chat_id: str | None = None,
+    batch_size: int = config.IMPORT_BATCH_SIZE,
+) -> ImportReport:
+    rows = EventImport(stream, fmt, default_chat_id=default_chat_id)
+    started = time.perf_counter()
+    result = database.import_events(rows, batch_size=batch_size)
+    return rows.report(result.total, time.perf_counter() - started)
+
+
+def format_report(report: ImportReport, max_lines: int = 10) -> str:
+    text = (
+        f"Импортировано событий: {report.inserted} "
+        f"({report.rows_per_sec:.0f} строк/с)\n"
+        f"Отклонено строк: {report.rejected_count}"
+    )
+    if report.rejected:
+        text += "\n" + "\n".join(
+            f"  строка {item.line}: {item.error}"
+            for item in report.rejected[:max_lines]
+        )
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import of events")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None)
+    parser.add_argument("--chat-id", default=None, help="chat_id for rows without it")
+    parser.add_argument("--batch-size", type=int, default=config.IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    with open(args.path, "r", encoding="utf-8-sig", newline="") as stream:
+        report = import_events(
+            SQLDataBase(),
+            stream,
+            fmt,
+            default_chat_id=args.chat_id,
+            batch_size=args.batch_size,
+        )
+    print(format_report(report, max_lines=MAX_REJECTED))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Выбор лидера между репликами бота через аренду (lease).
+
+Лидер раз в ttl / 3 продлевает аренду, остальные реплики пытаются ее
+занять и получают ее только после истечения. Задачи, которые должны идти в
+одном экземпляре (сканирование напоминаний), запускаются в on_elected и
+останавливаются в on_revoked.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable
+
+from .core import config
+from .database import AsyncSQLDataBase
+
+# продление, только если аренда все еще наша; иначе занять, если свободна
+ACQUIRE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current or current == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class DatabaseLease:
+    """
+    Аренда в таблице leader_lease. Время берется с часов реплики, поэтому
+    расхождение часов должно быть заметно меньше ttl.
+    """
+
+    def __init__(self, database: AsyncSQLDataBase):
+        self.database = database
+
+    async def acquire(self, name: str, holder: str, ttl: float) -> bool:
+        return await self.database.acquire_lease(name, holder, ttl)
+
+    async def release(self, name: str, holder: str) -> None:
+        await self.database.release_lease(name, holder)
+
+
+class RedisLease:
+    """
+    Аренда на ключе leader:{name} с TTL на стороне Redis
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self._acquire = redis.register_script(ACQUIRE_SCRIPT)
+        self._release = redis.register_script(RELEASE_SCRIPT)
+
+    async def acquire(self, name: str, holder: str, ttl: float) -> bool:
+        return bool(
+            await self._acquire(keys=[f"leader:{name}"], args=[holder, int(ttl * 1000)])
+        )
+
+    async def release(self, name: str, holder: str) -> None:
+        await self._release(keys=[f"leader:{name}"], args=[holder])
+
+
+def get_lease(database: AsyncSQLDataBase):
+    if config.SERIALIZER == "redis":
+        from .storage import get_redis
+
+        return RedisLease(get_redis())
+    return DatabaseLease(database)
+
+
+class LeaderElection:
+    def __init__(
+        self,
+        lease,
+        name: str,
+        on_elected: Callable[[], Awaitable[None]],
+        on_revoked: Callable[[], Awaitable[None]],
+        ttl: float = config.LEADER_LEASE_TTL,
+    ):
+        self.lease = lease
+        self.name = name
+        self.on_elected = on_elected
+        self.on_revoked = on_revoked
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._task: asyncio.Task | None = None
+
+    async def _step(self) -> None:
+        try:
+            acquired = await self.lease.acquire(self.name, self.holder, self.ttl)
+        except Exception as e:
+            # не смогли продлить - считаем, что аренда потеряна
+            logging.log(level=logging.ERROR, msg=f"leader {self.name}: {e}")
+            acquired = False
+
+        if acquired and not self.is_leader:
+            logging.info(f"leader {self.name}: elected {self.holder}")
+            try:
+                await self.on_elected()
+            except Exception as e:
+                # лидер без запущенных задач хуже, чем никакого: отдаем аренду,
+                # и ее займет другая реплика или мы на следующем шаге
+                logging.log(
+                    level=logging.ERROR, msg=f"leader {self.name}: on_elected: {e}"
+                )
+                await self._resign()
+                return
+            self.is_leader = True
+        elif not acquired and self.is_leader:
+            logging.warning(f"leader {self.name}: lost lease {self.holder}")
+            self.is_leader = False
+            await self.on_revoked()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._step()
+            except Exception as e:
+                logging.log(level=logging.ERROR, msg=f"leader {self.name}: {e}")
+            await asyncio.sleep(self.ttl / 3)
+
+    async def start(self) -> None:
+        await self._step()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.is_leader:
+            self.is_leader = False
+            await self._resign()
+
+    async def _resign(self) -> None:
+        """
+        Останавливает задачи лидера и освобождает аренду
+        """
+        try:
+            await self.on_revoked()
+        except Exception as e:
+            logging.log(level=logging.ERROR, msg=f"leader {self.name}: on_revoked: {e}")
+        try:
+            # следующая реплика сможет занять аренду сразу, без ожидания ttl
+            await self.lease.release(self.name, self.holder)
+        except Exception as e:
+            logging.log(level=logging.ERROR, msg=f"leader {self.name}: {e}")
@@ -1,15 +1,20 @@
 import asyncio
 
 from .core import config
-from .gradio import gradio_app
-from .telebot import bot, check_events, dp, on_startup, scheduler
+
+# модули интерфейсов импортируются внутри main(): процесс загружает только
+# выбранный (aiogram или gradio), а не оба
 
 
 async def main():
 
-    # Start scheduler for notifications
-    scheduler.add_job(check_events, "interval", minutes=1)
-    scheduler.start()
+    if config.INTERFACE == "telegram" and config.WORKERS > 1:
+        from .core import get_api_token
+        from .workers import run_supervisor
+
+        # напоминания и обработку апдейтов запускают процессы-воркеры
+        await run_supervisor(get_api_token())
+        return
 
     # demo.launch(server_name="0.0.0.0", server_port=7860)
     # await run()
@@ -17,20 +22,63 @@ async def main():
     # return
 
     if config.INTERFACE == "telegram":
+        from .metrics import start_metrics_server
+        from .storage import close_redis
+        from .telebot import (
+            accounts,
+            bot,
+            database,
+            dp,
+            leader,
+            on_startup,
+            scheduler,
+        )
+        from .webhook import run_webhook
+
+        # Start scheduler for notifications
+        scheduler.start()
+        await leader.start()
+        await accounts.warm()
+
         # asyncio.create_task(
-        await dp.start_polling(bot, on_startup=on_startup)
+        metrics = await start_metrics_server()
+        try:
+            if config.BOT_MODE == "webhook":
+                await run_webhook(dp, bot, on_startup=on_startup)
+            else:
+                await dp.start_polling(bot, on_startup=on_startup)
+        finally:
+            await leader.stop()
+            # записи из буфера до закрытия процесса
+            await database.drain()
+            await close_redis()
+            if metrics is not None:
+                await metrics.cleanup()
     # )
     # asyncio.c
 
     elif config.INTERFACE == "gradio":
-        # gradio_app.launch(server_name="0.0.0.0", server_port=7860)
-        import threading
+        from . import gradio
+        from .metrics import start_metrics_server
+        from .storage import close_redis
+        from .telebot import database, leader, reminders, scheduler
 
-        def run_gradio_app():
-            gradio_app.launch(server_name="0.0.0.0", server_port=7860)
+        # напоминания идут в том же процессе и через тот же выбор лидера,
+        # что и в режиме telegram; база - общая, с тем же кэшем событий
+        gradio.database, gradio.reminders = database, reminders
+        scheduler.start()
+        await leader.start()
 
-        gradio_thread = threading.Thread(target=run_gradio_app, daemon=True)
-        gradio_thread.start()
+        metrics = await start_metrics_server()
+        try:
+            await gradio.serve_gradio()
+        finally:
+            await leader.stop()
+            # записи из буфера до закрытия процесса
+            await database.drain()
+            await close_redis()
+            if metrics is not None:
+                await metrics.cleanup()
     else:
         raise ValueError("Нужно указать интерфейс!")
 
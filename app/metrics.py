@@ -0,0 +1,217 @@
+"""
+Метрики горячего пути в текстовом формате Prometheus.
+
+Счетчики и гистограммы хранятся в памяти процесса, /metrics отдает их на
+METRICS_HOST:METRICS_PORT (0 - выключено). Запросы к базе считаются через
+события SQLAlchemy, а число запросов на один апдейт - через contextvar,
+который AsyncSQLDataBase передает в поток пула.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import Engine, event
+
+from .core import config
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+LAG_BUCKETS = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # по ключу меток: счетчики бакетов (не накопительные), сумма, число
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    break
+            else:
+                index = len(self.buckets)
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    labels = format_labels(self.labels, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = format_labels(self.labels, key)
+                lines.append(f"{self.name}_sum{labels} {total[0]}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HANDLER_SECONDS = REGISTRY.register(
+    Histogram("bot_handler_seconds", "Handler latency", ("handler",))
+)
+HANDLER_ERRORS = REGISTRY.register(
+    Counter("bot_handler_errors_total", "Handler exceptions", ("handler",))
+)
+UPDATE_QUERIES = REGISTRY.register(
+    Histogram(
+        "bot_update_db_queries", "SQL statements per update", buckets=QUERY_BUCKETS
+    )
+)
+DB_QUERY_SECONDS = REGISTRY.register(
+    Histogram("db_query_seconds", "SQL statement latency", ("statement",))
+)
+DB_METHOD_SECONDS = REGISTRY.register(
+    Histogram("db_method_seconds", "SQLDataBase method latency", ("method",))
+)
+WRITE_BATCH_ROWS = REGISTRY.register(
+    Histogram(
+        "db_write_batch_rows",
+        "Writes committed in one WriteBehind transaction",
+        buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+    )
+)
+REMINDER_LAG_SECONDS = REGISTRY.register(
+    Histogram(
+        "reminder_lag_seconds",
+        "Reminder send time minus scheduled time",
+        buckets=LAG_BUCKETS,
+    )
+)
+REMINDERS_SENT = REGISTRY.register(
+    Counter("reminders_sent_total", "Reminder send attempts", ("result",))
+)
+RETENTION_ARCHIVED = REGISTRY.register(
+    Counter("retention_archived_total", "Events moved out of the event table")
+)
+
+
+@dataclass
+class UpdateStats:
+    queries: int = 0
+
+
+# статистика текущего апдейта, None - вне обработки апдейта
+current_update: ContextVar[UpdateStats | None] = ContextVar(
+    "current_update", default=None
+)
+
+
+def instrument_engine(engine: Engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(connection, cursor, statement, *args):
+        connection.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(connection, cursor, statement, *args):
+        started = connection.info["query_started"].pop()
+        # тип запроса, а не текст: ограниченное число значений метки
+        kind = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+        DB_QUERY_SECONDS.observe(time.perf_counter() - started, statement=kind)
+        stats = current_update.get()
+        if stats is not None:
+            stats.queries += 1
+
+
+async def start_metrics_server(
+    host: str = config.METRICS_HOST, port: int = config.METRICS_PORT
+):
+    """
+    Поднимает /metrics, возвращает AppRunner (None, если port = 0)
+    """
+    if not port:
+        return None
+    from aiohttp import web
+
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            text=REGISTRY.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"metrics: listening on {host}:{port}/metrics")
+    return runner
@@ -0,0 +1,54 @@
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from .metrics import (
+    HANDLER_ERRORS,
+    HANDLER_SECONDS,
+    UPDATE_QUERIES,
+    UpdateStats,
+    current_update,
+)
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Outer middleware апдейта: считает SQL-запросы за всю обработку
+    """
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict):
+        stats = UpdateStats()
+        token = current_update.set(stats)
+        try:
+            return await handler(event, data)
+        finally:
+            current_update.reset(token)
+            UPDATE_QUERIES.observe(stats.queries)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Inner middleware: время хендлера, метка - команда (из фильтра Command)
+    или имя функции хендлера
+    """
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict):
+        command = data.get("command")
+        if command is not None:
+            name = command.command
+        else:
+            handler_object = data.get("handler")
+            name = handler_object.callback.__name__ if handler_object else "unknown"
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, handler=name)
@@ -0,0 +1,163 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from .core import config
+from .database import AsyncSQLDataBase
+from .database.models import EventNotofication, EventSeriesInfo
+
+# ограничение одного сна, чтобы переживать перевод системных часов
+MAX_SLEEP = 3600
+
+
+class ReminderEngine:
+    """
+    Планировщик напоминаний на min-heap по времени срабатывания.
+
+    Неотправленные события на horizon вперед загружаются из базы при старте
+    и перед концом окна, новые добавляются через add(). Для ближайшего
+    события ставится точный таймер, поэтому база не опрашивается по
+    расписанию. Повторяющиеся события раскрываются только внутри окна.
+
+    Раз в rescan окно перечитывается, чтобы подхватить события, добавленные
+    другими репликами (add() работает только в процессе-лидере).
+    """
+
+    def __init__(
+        self,
+        database: AsyncSQLDataBase,
+        deliver: Callable[[list[EventNotofication]], Awaitable[None]],
+        lead: timedelta = timedelta(minutes=config.REMINDER_LEAD_MINUTES),
+        horizon: timedelta = timedelta(hours=config.REMINDER_HORIZON_HOURS),
+        rescan: timedelta = timedelta(minutes=config.REMINDER_RESCAN_MINUTES),
+    ):
+        self.database = database
+        self.deliver = deliver
+        self.lead = lead
+        self.horizon = max(horizon, lead + timedelta(minutes=1))
+        self.rescan = rescan
+
+        self._heap: list[tuple[datetime, int, EventNotofication]] = []
+        self._counter = itertools.count()
+        self._scheduled: set[tuple] = set()
+        self._in_flight: set[tuple] = set()
+        self._loaded_at: datetime | None = None
+        self._loaded_until: datetime | None = None
+        self._wakeup = asyncio.Event()
+        self._running = False
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def add(self, event: EventNotofication) -> None:
+        if event.event_date < datetime.now():
+            # как и load(): о прошедших событиях не напоминаем
+            return
+        self._push(event)
+
+    def _push(self, event: EventNotofication) -> None:
+        key = event.key
+        if key in self._scheduled or key in self._in_flight:
+            return
+        if self._loaded_until is None or event.event_date > self._loaded_until:
+            # не запущен (не лидер) или за окном: попадет в очередь при
+            # следующей загрузке
+            return
+        fire_at = event.event_date - self.lead
+        heapq.heappush(self._heap, (fire_at, next(self._counter), event))
+        self._scheduled.add(key)
+        if self._heap[0][2] is event:
+            # новое событие раньше текущего таймера
+            self._wakeup.set()
+
+    def add_series(self, series: EventSeriesInfo) -> None:
+        if self._loaded_until is None:
+            return
+        end = self._loaded_until + timedelta(microseconds=1)
+        for event in series.notifications(datetime.now(), end):
+            self.add(event)
+
+    async def load(self) -> None:
+        """
+        Загружает неотправленные события на horizon вперед. Пока движок
+        не запущен (реплика не лидер), ничего не делает.
+        """
+        if not self._running:
+            return
+        now = datetime.now()
+        until = now + self.horizon
+        events = await self.database.get_events(start=now, end=until)
+        if not self._running:
+            return
+        self._loaded_at = now
+        self._loaded_until = until
+        for event in events:
+            self._push(event)
+        self._wakeup.set()
+        logging.info(f"reminders: loaded {len(events)} pending events")
+
+    async def start(self) -> None:
+        self._running = True
+        await self.load()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._running = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._heap.clear()
+        self._scheduled.clear()
+        self._loaded_at = self._loaded_until = None
+
+    def _pop_due(self, now: datetime) -> list[EventNotofication]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, event = heapq.heappop(self._heap)
+            self._scheduled.discard(event.key)
+            due.append(event)
+        return due
+
+    async def _run(self) -> None:
+        while True:
+            now = datetime.now()
+            reload_at = self._loaded_until - self.lead
+            if self.rescan:
+                reload_at = min(reload_at, self._loaded_at + self.rescan)
+            if now >= reload_at:
+                try:
+                    await self.load()
+                except Exception as e:
+                    logging.log(level=logging.ERROR, msg=f"reminders: {e}")
+                    await asyncio.sleep(60)
+                continue
+
+            due = self._pop_due(now)
+            if due:
+                keys = {event.key for event in due}
+                self._in_flight |= keys
+                try:
+                    await self.deliver(due)
+                except Exception as e:
+                    logging.log(level=logging.ERROR, msg=f"reminders: {e}")
+                finally:
+                    self._in_flight -= keys
+                continue
+
+            self._wakeup.clear()
+            next_at = reload_at
+            if self._heap:
+                next_at = min(next_at, self._heap[0][0])
+            timeout = min((next_at - now).total_seconds(), MAX_SLEEP)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
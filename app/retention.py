@@ -0,0 +1,131 @@
+"""
+Срок хранения событий.
+
+События старше RETENTION_DAYS пачками по RETENTION_BATCH_SIZE переносятся в
+таблицу event_archive или в gzip JSONL (RETENTION_ARCHIVE), между пачками -
+пауза RETENTION_BATCH_PAUSE, чтобы бот успевал писать. После прогона
+выполняются incremental VACUUM и ANALYZE. В боте задача идет по расписанию
+только у лидера (app.leader), вручную:
+
+    python -m app.retention --days 180
+    python -m app.retention --vacuum   # один раз, чтобы включить auto_vacuum
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+from .core import config
+from .database import AsyncSQLDataBase, SQLDataBase
+from .database.models import RetentionReport
+from .metrics import RETENTION_ARCHIVED
+
+
+def write_jsonl(path: str, rows: list[dict]) -> None:
+    with gzip.open(path, "at", encoding="utf-8") as stream:
+        for row in rows:
+            stream.write(json.dumps(row, default=datetime.isoformat) + "\n")
+
+
+def run_retention(
+    database: SQLDataBase,
+    days: int = config.RETENTION_DAYS,
+    archive: str = config.RETENTION_ARCHIVE,
+    batch_size: int = config.RETENTION_BATCH_SIZE,
+    pause: float = config.RETENTION_BATCH_PAUSE,
+    archive_dir: str = config.RETENTION_ARCHIVE_DIR,
+) -> RetentionReport:
+    """
+    В режиме jsonl пачка сначала пишется в файл и только потом удаляется,
+    поэтому сбой между шагами дает дубликат в архиве, а не потерю
+    """
+    started = time.perf_counter()
+    cutoff = datetime.now() - timedelta(days=days)
+    report = RetentionReport(destination="event_archive", cutoff=cutoff)
+    if days <= 0:
+        return report
+
+    path = None
+    if archive == "jsonl":
+        os.makedirs(archive_dir, exist_ok=True)
+        path = os.path.join(
+            archive_dir, f"events-{datetime.now():%Y%m%d-%H%M%S}.jsonl.gz"
+        )
+        report.destination = path
+
+    for notified in (True, False):
+        while rows := database.get_expired_events(cutoff, notified, batch_size):
+            if path is not None:
+                write_jsonl(path, rows)
+            report.archived += database.archive_events(rows, to_table=path is None)
+            report.batches += 1
+            time.sleep(pause)
+
+    if report.archived:
+        database.maintain()
+    report.seconds = time.perf_counter() - started
+    logging.info(
+        f"retention: archived {report.archived} events older than "
+        f"{cutoff:%Y-%m-%d} to {report.destination} in {report.seconds:.1f}s"
+    )
+    return report
+
+
+class RetentionJob:
+    """
+    Задача для планировщика бота: прогон в отдельном потоке и счетчики
+    """
+
+    def __init__(self, database: AsyncSQLDataBase):
+        self.database = database
+        self.last_report: RetentionReport | None = None
+        self.total_archived = 0
+
+    async def run(self) -> RetentionReport:
+        try:
+            report = await asyncio.to_thread(run_retention, self.database.sync)
+        except Exception as e:
+            logging.log(level=logging.ERROR, msg=f"retention: {e}")
+            raise
+        self.last_report = report
+        RETENTION_ARCHIVED.inc(report.archived)
+        self.total_archived += report.archived
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old events")
+    parser.add_argument("--days", type=int, default=config.RETENTION_DAYS)
+    parser.add_argument(
+        "--archive", choices=["table", "jsonl"], default=config.RETENTION_ARCHIVE
+    )
+    parser.add_argument("--batch-size", type=int, default=config.RETENTION_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=config.RETENTION_BATCH_PAUSE)
+    parser.add_argument(
+        "--vacuum", action="store_true", help="full VACUUM after archiving"
+    )
+    args = parser.parse_args()
+
+    database = SQLDataBase()
+    report = run_retention(
+        database,
+        days=args.days,
+        archive=args.archive,
+        batch_size=args.batch_size,
+        pause=args.pause,
+    )
+    print(
+        f"archived {report.archived} events in {report.batches} batches "
+        f"to {report.destination} ({report.seconds:.1f}s)"
+    )
+    if args.vacuum:
+        database.vacuum()
+
+
+if __name__ == "__main__":
+    main()
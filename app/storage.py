@@ -0,0 +1,179 @@
+"""
+Горячее состояние бота: в памяти процесса или в Redis.
+
+При SERIALIZER = "redis" FSM aiogram, кэш аккаунтов и кэш событий
+пользователей живут в Redis (REDIS_HOST/REDIS_PORT), и несколько реплик
+бота видят одно и то же состояние.
+"""
+
+import json
+import logging
+from dataclasses import asdict
+from datetime import date, datetime
+from functools import lru_cache
+
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from .accounts import AccountCache
+from .core import config
+from .database import AsyncSQLDataBase
+from .database.models import EventResponse
+
+
+@lru_cache
+def get_redis():
+    from redis.asyncio import ConnectionPool, Redis
+
+    pool = ConnectionPool(
+        host=config.REDIS_HOST,
+        port=config.REDIS_PORT,
+        db=config.REDIS_DB,
+        max_connections=config.REDIS_MAX_CONNECTIONS,
+        decode_responses=True,
+    )
+    return Redis(connection_pool=pool)
+
+
+async def close_redis() -> None:
+    if get_redis.cache_info().currsize:
+        await get_redis().aclose()
+        get_redis.cache_clear()
+
+
+class RedisAccountCache:
+    """
+    Общее для всех реплик множество известных chat_id
+    """
+
+    key = "accounts:known"
+
+    def __init__(self, database: AsyncSQLDataBase, redis=None, chunk: int = 10_000):
+        self.database = database
+        self.redis = redis or get_redis()
+        self.chunk = chunk
+
+    async def warm(self) -> None:
+        chat_ids = await self.database.get_account_ids()
+        for offset in range(0, len(chat_ids), self.chunk):
+            await self.redis.sadd(self.key, *chat_ids[offset : offset + self.chunk])
+        logging.info(f"accounts: warmed {len(chat_ids)} accounts in redis")
+
+    async def ensure(self, chat_id: str) -> None:
+        if await self.redis.sismember(self.key, chat_id):
+            return
+        await self.database.ensure_account(user_id=chat_id)
+        await self.redis.sadd(self.key, chat_id)
+
+
+class RedisEventCache:
+    """
+    Кэш чтения событий пользователя: hash events:{user_id}, поле - диапазон.
+
+    Любая запись событий пользователя удаляет весь его hash. Ошибки Redis
+    не ломают ответ, запрос просто уходит в базу.
+    """
+
+    def __init__(self, redis=None, ttl: int = config.REDIS_EVENT_CACHE_TTL):
+        self.redis = redis or get_redis()
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return f"events:{user_id}"
+
+    @staticmethod
+    def _field(kind: str, start: datetime, end: datetime) -> str:
+        return f"{kind}|{start.isoformat()}|{end.isoformat()}"
+
+    async def _get(self, user_id: str, field: str):
+        from redis import RedisError
+
+        try:
+            raw = await self.redis.hget(self._key(user_id), field)
+        except RedisError as e:
+            logging.warning(f"event cache: {e}")
+            return None
+        return None if raw is None else json.loads(raw)
+
+    async def _set(self, user_id: str, field: str, value) -> None:
+        from redis import RedisError
+
+        key = self._key(user_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, field, json.dumps(value))
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except RedisError as e:
+            logging.warning(f"event cache: {e}")
+
+    async def get_events(
+        self, user_id: str, start: datetime, end: datetime
+    ) -> list[EventResponse] | None:
+        raw = await self._get(user_id, self._field("list", start, end))
+        if raw is None:
+            return None
+        return [EventResponse(**item) for item in raw]
+
+    async def set_events(
+        self,
+        user_id: str,
+        start: datetime,
+        end: datetime,
+        events: list[EventResponse],
+    ) -> None:
+        value = [asdict(event) for event in events]
+        await self._set(user_id, self._field("list", start, end), value)
+
+    async def get_grouped(
+        self, user_id: str, start: datetime, end: datetime
+    ) -> dict[date, list[EventResponse]] | None:
+        raw = await self._get(user_id, self._field("grouped", start, end))
+        if raw is None:
+            return None
+        return {
+            date.fromisoformat(day): [EventResponse(**item) for item in items]
+            for day, items in raw.items()
+        }
+
+    async def set_grouped(
+        self,
+        user_id: str,
+        start: datetime,
+        end: datetime,
+        grouped: dict[date, list[EventResponse]],
+    ) -> None:
+        value = {
+            day.isoformat(): [asdict(event) for event in events]
+            for day, events in grouped.items()
+        }
+        await self._set(user_id, self._field("grouped", start, end), value)
+
+    async def invalidate(self, user_id: str) -> None:
+        from redis import RedisError
+
+        try:
+            await self.redis.delete(self._key(user_id))
+        except RedisError as e:
+            logging.warning(f"event cache: {e}")
+
+
+def get_fsm_storage() -> BaseStorage:
+    if config.SERIALIZER == "redis":
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        return RedisStorage(get_redis())
+    return MemoryStorage()
+
+
+def get_account_cache(database: AsyncSQLDataBase):
+    if config.SERIALIZER == "redis":
+        return RedisAccountCache(database)
+    return AccountCache(database)
+
+
+def get_event_cache() -> RedisEventCache | None:
+    if config.SERIALIZER == "redis":
+        return RedisEventCache()
+    return None
@@ -1,4 +1,6 @@
+import io
 import logging
+import time
 from functools import wraps
 
 logging.basicConfig(level=logging.INFO, filename="log.log")
@@ -7,19 +9,36 @@ from datetime import datetime, timedelta
 from aiogram import Bot, Dispatcher, types
 from aiogram.filters import Command
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import BotCommand, KeyboardButton, ReplyKeyboardMarkup
+from aiogram.types import (
+    BotCommand,
+    KeyboardButton,
+    MenuButtonCommands,
+    ReplyKeyboardMarkup,
+)
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from .database import get_database
-from .helper import format_events, get_schedule, get_time_range
+from .cache import response_cache
+from .database import get_async_database
+from .helper import format_events, get_schedule, get_time_range, timetable
+from .importer import EventImport, detect_format, format_report
+from .leader import LeaderElection, get_lease
+from .middlewares import HandlerMetricsMiddleware, UpdateMetricsMiddleware
+from .reminders import ReminderEngine
+from .retention import RetentionJob
+from .storage import get_account_cache, get_event_cache, get_fsm_storage
+from .timetable import TimetableStore
 
 logging.basicConfig(level=logging.INFO, filename="")
-from .core import get_api_token
-from .database import EventCreate, get_database
+from .core import config, get_api_token
+from .database import EventCreate
+from .database.models import EventNotofication, SeriesCreate
+from .delivery import ReminderDelivery
 
 bot = Bot(token=get_api_token())
-dp = Dispatcher()
-database = get_database()
+dp = Dispatcher(storage=get_fsm_storage())
+dp.update.outer_middleware(UpdateMetricsMiddleware())
+dp.message.middleware(HandlerMetricsMiddleware())
+database = get_async_database(event_cache=get_event_cache())
 
 KEYBOARD = ReplyKeyboardMarkup(
     keyboard=[
@@ -50,16 +69,18 @@ class EventStates(StatesGroup):
 
 
 scheduler = AsyncIOScheduler()
+delivery = ReminderDelivery(bot, database)
+accounts = get_account_cache(database)
+timetables = TimetableStore(database)
 
 
-def check_user(message: types.Message):
-    if not database.account_exists(user_id=str(message.chat.id)):
-        database.add_account(user_id=str(message.chat.id))
+async def check_user(message: types.Message):
+    await accounts.ensure(str(message.chat.id))
 
 
 @dp.message(Command(commands=["start", "help"]))
 async def send_welcome(message: types.Message):
-    check_user(message)
+    await check_user(message)
 
     help_text = (
         "Добро пожаловать в чат-бот для расписаний!\n\n"
@@ -68,6 +89,9 @@ async def send_welcome(message: types.Message):
         "/tomorrow - расписание завтра\n"
         "/week - расписание на неделю\n"
         "/add - добавить событие\n"
+        "/repeat - добавить повторяющееся событие\n"
+        "/import - загрузить события из CSV/JSONL файла\n"
+        "/class - выбрать класс для расписания\n"
         "/schedule - как добавлять события\n"
         "/help - общая информация"
     )
@@ -78,7 +102,7 @@ async def send_welcome(message: types.Message):
 
 @dp.message(Command(commands=["schedule"]))
 async def schedule_info(message: types.Message):
-    check_user(message)
+    await check_user(message)
 
     info_text = (
         "Чтобы добавить событие используйте форму:\n"
@@ -93,27 +117,61 @@ async def schedule_info(message: types.Message):
 
 @dp.message(Command(commands=["today", "tomorrow", "week"]))
 async def show_schedule(message: types.Message):
-    check_user(message)
+    await check_user(message)
 
+    chat_id = str(message.chat.id)
     period = message.text[1:]  # Remove leading '/'
     start, end = get_time_range(period)
 
-    match message.text[1:]:
+    class_id = await timetables.get_user_class(chat_id)
+    lessons, class_version = None, None
+    if class_id is not None:
+        class_version, lessons = await timetables.get_timetable(class_id)
+    # перезагрузка общего расписания или расписания класса - промах кэша
+    version = (timetable.refresh(), class_id, class_version)
+    generation = response_cache.generation(chat_id)
+    response = response_cache.get(chat_id, period, start.date(), version)
+    if response is None:
+        response = await render_schedule(chat_id, period, start, end, lessons)
+        response_cache.set(
+            chat_id,
+            period,
+            start.date(),
+            start,
+            end,
+            response,
+            generation=generation,
+            version=version,
+        )
+    await message.reply(response)
+    # check for events
+    # await check_events()
+
+
+async def render_schedule(
+    chat_id: str,
+    period: str,
+    start: datetime,
+    end: datetime,
+    lessons: dict[str, str] | None = None,
+) -> str:
+    match period:
         case "today":
             schedule = get_schedule(
-                datetime.strftime(start, "%d.%m"), str(start.weekday())
+                datetime.strftime(start, "%d.%m"), str(start.weekday()), lessons
             )
             if start.weekday() == 6:
                 schedule = "В воскресенье не учимся)\n"
 
         case "tomorrow":
             schedule = get_schedule(
-                datetime.strftime(start, "%d.%m"), str(start.weekday())
+                datetime.strftime(start, "%d.%m"), str(start.weekday()), lessons
             )
             if start.weekday() == 6:
                 schedule = "В воскресенье не учимся)\n"
 
         case "week":
+            grouped = await database.get_user_events_grouped(chat_id, start, end)
             schedule = []
             while start < end:
                 if start.weekday() == 6:
@@ -123,14 +181,31 @@ async def show_schedule(message: types.Message):
                 else:
                     schedule.append(
                         get_schedule(
-                            datetime.strftime(start, "%d.%m"), str(start.weekday())
+                            datetime.strftime(start, "%d.%m"),
+                            str(start.weekday()),
+                            lessons,
                         )
                     )
+
+                day_events = grouped.get(start.date())
+                if day_events:
+                    schedule[-1] += (
+                        f"\nСобытия на {datetime.strftime(start, "%d.%m")}\n\n"
+                        + "\n".join(
+                            [
+                                f"\t{idx + 1}. {event.event_name} в {event.event_time}"
+                                for idx, event in enumerate(day_events)
+                            ]
+                        )
+                        + "\n"
+                    )
                 start += timedelta(days=1)
 
             schedule = "\n".join(schedule)
 
-    events = database.get_user_events(str(message.chat.id), start, end)
+    events = []
+    if period != "week":
+        events = await database.get_user_events(chat_id, start, end)
 
     # response = f"{period.capitalize()} schedule:\n{format_events(events)}"
     response = ""
@@ -143,9 +218,30 @@ async def show_schedule(message: types.Message):
                 for idx, event in enumerate(events)
             ]
         )
-    await message.reply(response)
-    # check for events
-    # await check_events()
+    return response
+
+
+@dp.message(Command(commands=["class"]))
+async def set_class(message: types.Message):
+    await check_user(message)
+
+    chat_id = str(message.chat.id)
+    class_name = message.text.replace("/class", "", 1).strip()
+    if not class_name:
+        user_class = await database.get_user_class(chat_id)
+        if user_class:
+            await message.reply(f"Ваш класс: {user_class[1]}")
+        else:
+            await message.reply(
+                "Класс не выбран, показывается общее расписание\n"
+                "Выбрать класс: /class 10А"
+            )
+        return
+
+    if await timetables.set_user_class(chat_id, class_name) is None:
+        await message.reply(f"Класс {class_name} не найден")
+    else:
+        await message.reply(f"Класс {class_name} выбран", reply_markup=KEYBOARD)
 
 
 @dp.message(Command(commands=["add"]))
@@ -157,7 +253,7 @@ async def add_event_start(message: types.Message):
             event_date = datetime.strptime(date_str, "%Y-%m-%d %H:%M")
             event = EventCreate(event_name=event_name, event_date=event_date)
 
-            database.add_event(str(message.chat.id), event)
+            reminders.add(await database.add_event(str(message.chat.id), event))
 
             await message.reply(f"Event added: {event_name} at {date_str}")
         except ValueError:
@@ -172,23 +268,114 @@ async def add_event_start(message: types.Message):
     # await check_events()
 
 
-async def check_events():
+@dp.message(Command(commands=["repeat"]))
+async def add_series_start(message: types.Message):
+    args = message.text.replace("/repeat", "", 1).strip().rsplit(maxsplit=3)
+    if len(args) == 4:
+        event_name, day, time_str, rule = args
+        try:
+            series = SeriesCreate(
+                event_name=event_name, dtstart=f"{day} {time_str}", rule=rule
+            )
+        except ValueError:
+            await message.reply(
+                "Invalid format. Use: /repeat event_name YYYY-MM-DD HH:MM RULE"
+            )
+            return
+
+        await check_user(message)
+        reminders.add_series(await database.add_series(str(message.chat.id), series))
+        await message.reply(
+            f"Series added: {event_name} from {day} {time_str} "
+            f"({series.rule.to_string()})"
+        )
+    else:
+        await message.reply(
+            "Please provide event name, first date and rule\n"
+            "Example: /repeat Консультация 2025-09-01 15:00 weekly\n"
+            "RULE: daily, weekly или FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10"
+        )
+
+
+@dp.message(Command(commands=["import"]))
+async def import_events_start(message: types.Message):
+    document = message.document
+    if document is None:
+        await message.reply(
+            "Прикрепите CSV или JSONL файл с подписью /import\n"
+            "Поля: chat_id, event_name, event_date (YYYY-MM-DD HH:MM)\n"
+            "Строки без chat_id добавляются в этот чат, "
+            "другие чаты - только для администраторов"
+        )
+        return
+
+    chat_id = str(message.chat.id)
+    # события в чужие чаты (и напоминания туда) - только из списка администраторов
+    sender = message.from_user.id if message.from_user else None
+    content = await bot.download(document)
+    stream = io.TextIOWrapper(content, encoding="utf-8-sig", newline="")
+    rows = EventImport(
+        stream,
+        detect_format(document.file_name or ""),
+        default_chat_id=chat_id,
+        allowed_chat_id=None if sender in config.IMPORT_ADMIN_IDS else chat_id,
+    )
+    started = time.perf_counter()
+    # события из окна напоминаний возвращаются с id, окно не перечитывается
+    result = await database.import_events(
+        rows,
+        due_until=datetime.now() + timedelta(hours=config.REMINDER_HORIZON_HOURS),
+    )
+    report = rows.report(result.total, time.perf_counter() - started)
+
+    for event in result.due:
+        reminders.add(event)
+    await message.reply(format_report(report))
+
+
+async def check_events(events: list[EventNotofication] | None = None):
     now = datetime.now()
-    end = now + timedelta(hours=1)
+    if events is None:
+        end = now + timedelta(minutes=config.REMINDER_LEAD_MINUTES)
+        events = await database.get_events(start=now, end=end)
 
-    events = database.get_events(start=now, end=end)
+    def render(event: EventNotofication) -> str:
+        time_left = event.event_date - now
+        minutes = max(int(time_left.total_seconds() // 60), 0)
+        return f"⏰ Напоминание: {event.event_name} начнется через {minutes} минут в {event.event_date.time()}!"
 
-    for event in events:
-        try:
-            time_left = event.event_date - now
-            minutes = int(time_left.total_seconds() // 60)
-            await bot.send_message(
-                event.chat_id,
-                f"⏰ Напоминание: {event.event_name} начнется через {minutes} минут в {event.event_date.time()}!",
-            )
-            database.set_event_state(event.event_id)
-        except Exception as e:
-            logging.log(level=logging.ERROR, msg=f"{e}")
+    await delivery.deliver(events, render)
+
+
+reminders = ReminderEngine(database, check_events)
+retention = RetentionJob(database)
+
+
+async def on_elected():
+    await reminders.start()
+    if config.RETENTION_DAYS > 0:
+        scheduler.add_job(
+            retention.run,
+            "interval",
+            hours=config.RETENTION_INTERVAL_HOURS,
+            id="retention",
+            replace_existing=True,
+        )
+
+
+async def on_revoked():
+    if scheduler.get_job("retention") is not None:
+        scheduler.remove_job("retention")
+    await reminders.stop()
+
+
+# при нескольких репликах напоминания и архивацию ведет только держатель аренды
+leader = LeaderElection(
+    get_lease(database),
+    "reminders",
+    on_elected=on_elected,
+    on_revoked=on_revoked,
+)
 
 
 # Глобальный обработчик ошибок
@@ -211,10 +398,13 @@ async def on_startup():
         BotCommand(command="tomorrow", description=""),
         BotCommand(command="week", description=""),
         BotCommand(command="add", description=""),
+        BotCommand(command="repeat", description=""),
+        BotCommand(command="import", description=""),
+        BotCommand(command="class", description=""),
         BotCommand(command="schedule", description=""),
         BotCommand(command="help", description=""),
     ]
     await bot.set_my_commands(commands)
 
     # Set the default menu button to display commands
-    await bot.set_menu_button()
+    await bot.set_chat_menu_button(menu_button=MenuButtonCommands())
@@ -0,0 +1,150 @@
+"""
+Расписания классов из базы.
+
+Индекс (class_id, weekday) -> текст строится лениво: уроки класса читаются
+из базы при первом обращении и держатся в ограниченном LRU, так что
+процесс хранит только те классы, которые у него спрашивают. Раз в
+TIMETABLE_CHECK_SECONDS версии загруженных классов сверяются с базой одним
+запросом, и перезаписанные расписания перечитываются.
+
+Загрузка расписания класса из JSON в формате app/schedule.json:
+
+    python -m app.timetable 10А path/to/schedule.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from .cache import LRUCache
+from .core import config
+from .database import AsyncSQLDataBase, SQLDataBase
+from .helper import ScheduleItem, render_timetable
+
+_UNKNOWN = object()
+
+
+class TimetableStore:
+    def __init__(
+        self,
+        database: AsyncSQLDataBase,
+        maxsize: int = config.TIMETABLE_CACHE_CLASSES,
+        ttl: float = config.TIMETABLE_CACHE_TTL,
+        check_interval: float = config.TIMETABLE_CHECK_SECONDS,
+    ):
+        self.database = database
+        self.check_interval = check_interval
+        self._classes = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._user_class = LRUCache(maxsize=config.ACCOUNT_CACHE_SIZE, ttl=ttl)
+        self._loading: dict[int, asyncio.Task] = {}
+        self._next_check = time.monotonic() + check_interval
+
+    async def _load(self, class_id: int) -> tuple[int, dict[str, str]]:
+        # версия до уроков: перезапись между запросами даст лишнее перечитывание,
+        # а не устаревшее расписание
+        versions = await self.database.get_class_versions([class_id])
+        schedule: dict[str, list[ScheduleItem]] = {}
+        for weekday, lesson, at in await self.database.get_class_lessons(class_id):
+            schedule.setdefault(str(weekday), []).append(
+                ScheduleItem(lesson=lesson, time=at)
+            )
+        return versions.get(class_id, 0), render_timetable(schedule)
+
+    async def get_lessons(self, class_id: int) -> dict[str, str]:
+        return (await self.get_timetable(class_id))[1]
+
+    async def get_timetable(self, class_id: int) -> tuple[int, dict[str, str]]:
+        """
+        (версия, расписание) класса; версия растет при перезаписи уроков
+        """
+        if self.check_interval and time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.warning(f"timetable version check failed: {e}")
+
+        timetable = self._classes.get(class_id)
+        if timetable is not None:
+            return timetable
+
+        # одновременные первые обращения к классу ждут одну загрузку
+        task = self._loading.get(class_id)
+        if task is None:
+            task = self._loading[class_id] = asyncio.create_task(self._load(class_id))
+        try:
+            timetable = await task
+        finally:
+            self._loading.pop(class_id, None)
+        self._classes.set(class_id, timetable)
+        return timetable
+
+    async def get_user_class(self, chat_id: str) -> int | None:
+        class_id = self._user_class.get(chat_id, _UNKNOWN)
+        if class_id is _UNKNOWN:
+            user_class = await self.database.get_user_class(chat_id)
+            class_id = user_class[0] if user_class else None
+            self._user_class.set(chat_id, class_id)
+        return class_id
+
+    async def get_user_lessons(self, chat_id: str) -> dict[str, str] | None:
+        """
+        Расписание класса пользователя, None - используется общее
+        """
+        class_id = await self.get_user_class(chat_id)
+        if class_id is None:
+            return None
+        return await self.get_lessons(class_id)
+
+    async def set_user_class(self, chat_id: str, class_name: str) -> int | None:
+        class_id = await self.database.set_user_class(chat_id, class_name)
+        if class_id is not None:
+            self._user_class.set(chat_id, class_id)
+        return class_id
+
+    def invalidate(self, class_id: int) -> None:
+        self._classes.pop(class_id)
+
+    async def refresh(self) -> None:
+        """
+        Сбрасывает классы, расписание которых перезаписано после загрузки
+        """
+        loaded = {
+            class_id: timetable[0]
+            for class_id in self._classes.keys()
+            if (timetable := self._classes.get(class_id)) is not None
+        }
+        if not loaded:
+            return
+        versions = await self.database.get_class_versions(list(loaded))
+        for class_id, version in loaded.items():
+            if versions.get(class_id, 0) != version:
+                self.invalidate(class_id)
+
+
+def load_timetable(database: SQLDataBase, class_name: str, path: str) -> int:
+    with open(path, "r", encoding="utf-8") as file:
+        raw = json.load(file)
+    lessons = {
+        int(day): [
+            (item.lesson, item.time) for item in (ScheduleItem(**t) for t in items)
+        ]
+        for day, items in raw.items()
+    }
+    return database.save_class_timetable(class_name, lessons)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a class timetable")
+    parser.add_argument("class_name")
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    class_id = load_timetable(SQLDataBase(), args.class_name, args.path)
+    print(f"{args.class_name}: class_id={class_id}")
+
+
+if __name__ == "__main__":
+    main()
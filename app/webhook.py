@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import signal
+from typing import Awaitable, Callable
+
+from aiogram import Bot, Dispatcher, types
+from aiohttp import web
+
+from .core import config
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class UpdateQueue:
+    """
+    Ограниченная очередь апдейтов и пул воркеров, которые ее разбирают.
+
+    HTTP-обработчик только кладет апдейт в очередь и сразу отвечает, сама
+    обработка идет в воркерах через dp.feed_update.
+    """
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        workers: int = config.WEBHOOK_WORKERS,
+        maxsize: int = config.WEBHOOK_QUEUE_SIZE,
+    ):
+        self.dp = dp
+        self.bot = bot
+        self.workers = workers
+        self._queue: asyncio.Queue[types.Update] = asyncio.Queue(maxsize=maxsize)
+        self._tasks: list[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def put(self, data: dict) -> bool:
+        update = types.Update.model_validate(data, context={"bot": self.bot})
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            update = await self._queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                logging.log(level=logging.ERROR, msg=f"webhook: {e}")
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def drain(self, timeout: float = config.WEBHOOK_DRAIN_TIMEOUT) -> None:
+        """
+        Дожидается обработки уже принятых апдейтов и останавливает воркеры
+        """
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"webhook: dropped {len(self)} updates on shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def create_app(updates, secret: str = config.WEBHOOK_SECRET) -> web.Application:
+    """
+    updates - UpdateQueue или app.workers.Supervisor: put(data) кладет
+    апдейт в очередь, False - очередь полна, ValueError - плохой апдейт
+    """
+
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret and request.headers.get(SECRET_HEADER) != secret:
+            return web.Response(status=401)
+
+        try:
+            accepted = updates.put(await request.json())
+        except ValueError:
+            return web.Response(status=400)
+
+        if not accepted:
+            # очередь переполнена: Telegram повторит доставку позже
+            return web.Response(status=503)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(config.WEBHOOK_PATH, handle_update)
+    return app
+
+
+async def run_webhook(
+    dp: Dispatcher,
+    bot: Bot,
+    on_startup: Callable[[], Awaitable[None]] | None = None,
+) -> None:
+    updates = UpdateQueue(dp, bot)
+    updates.start()
+
+    runner = web.AppRunner(create_app(updates))
+    await runner.setup()
+    site = web.TCPSite(runner, config.WEBHOOK_HOST, config.WEBHOOK_PORT)
+    await site.start()
+    logging.info(
+        f"webhook: listening on {config.WEBHOOK_HOST}:{config.WEBHOOK_PORT}"
+        f"{config.WEBHOOK_PATH}"
+    )
+
+    if config.WEBHOOK_BASE_URL:
+        await bot.set_webhook(
+            config.WEBHOOK_BASE_URL.rstrip("/") + config.WEBHOOK_PATH,
+            secret_token=config.WEBHOOK_SECRET or None,
+            max_connections=config.WEBHOOK_MAX_CONNECTIONS,
+        )
+    if on_startup is not None:
+        await on_startup()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await stop.wait()
+    finally:
+        # сначала перестаем принимать апдейты, потом дорабатываем очередь
+        await runner.cleanup()
+        await updates.drain()
+        await bot.session.close()
@@ -0,0 +1,387 @@
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import queue
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+import aiohttp
+from aiohttp import web
+
+from .core import config
+
+if TYPE_CHECKING:
+    # aiogram нужен только воркерам: супервизор в режиме polling его не грузит
+    from aiogram import Bot, Dispatcher
+
+# поля объекта апдейта, по которым определяется чат, в порядке приоритета
+UPDATE_CHAT_KEYS = ("chat", "message", "from", "user", "voter_chat")
+
+# пауза после ошибки getUpdates удваивается до этого предела (секунды)
+POLL_BACKOFF_MAX = 60.0
+
+Setup = Callable[
+    [int, bool, multiprocessing.Queue], Awaitable[tuple["Dispatcher", "Bot"]]
+]
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """
+    Jump consistent hash (Lamping, Veach): при изменении числа воркеров
+    переезжает только 1/N чатов
+    """
+    key &= 0xFFFFFFFFFFFFFFFF
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def update_chat_id(data: dict) -> int:
+    """
+    chat_id из сырого апдейта без валидации pydantic. Апдейты без чата
+    (например, inline_query без отправителя) идут в воркер 0.
+    """
+    if not isinstance(data, dict) or "update_id" not in data:
+        raise ValueError("not an update")
+    for key, value in data.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        for name in UPDATE_CHAT_KEYS:
+            item = value.get(name)
+            if isinstance(item, dict):
+                if "id" in item:
+                    return int(item["id"])
+                chat = item.get("chat")
+                if isinstance(chat, dict) and "id" in chat:
+                    return int(chat["id"])
+    return 0
+
+
+class ChatLanes:
+    """
+    Обработка апдейтов в воркере: чаты обрабатываются параллельно (не более
+    concurrency одновременно), апдейты одного чата - строго по очереди.
+    """
+
+    def __init__(self, dp: "Dispatcher", bot: "Bot", concurrency: int, maxsize: int):
+        from aiogram import types
+
+        self.dp = dp
+        self.bot = bot
+        self._validate = types.Update.model_validate
+        self._running = asyncio.Semaphore(concurrency)
+        self._pending = asyncio.Semaphore(maxsize)
+        self._tails: dict[int, asyncio.Task] = {}
+
+    async def acquire(self) -> None:
+        await self._pending.acquire()
+
+    def put(self, chat_id: int, data: dict) -> None:
+        task = asyncio.create_task(self._handle(self._tails.get(chat_id), data))
+        self._tails[chat_id] = task
+        task.add_done_callback(lambda done: self._done(chat_id, done))
+
+    def _done(self, chat_id: int, task: asyncio.Task) -> None:
+        self._pending.release()
+        if self._tails.get(chat_id) is task:
+            del self._tails[chat_id]
+
+    async def _handle(self, previous: asyncio.Task | None, data: dict) -> None:
+        if previous is not None:
+            await asyncio.wait([previous])
+        async with self._running:
+            try:
+                update = self._validate(data, context={"bot": self.bot})
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                logging.log(level=logging.ERROR, msg=f"worker: {e}")
+
+    async def drain(self) -> None:
+        if self._tails:
+            await asyncio.wait(list(self._tails.values()))
+
+
+class RemoteReminders:
+    """
+    Заменяет ReminderEngine в воркерах, которые не владеют напоминаниями:
+    новые события пересылаются воркеру-владельцу
+    """
+
+    def __init__(self, control: multiprocessing.Queue):
+        self.control = control
+
+    def add(self, event) -> None:
+        self.control.put(("add", event))
+
+    def add_series(self, series) -> None:
+        self.control.put(("add_series", series))
+
+
+async def serve_reminders(reminders, control: multiprocessing.Queue) -> None:
+    """
+    Принимает в воркере-владельце события из RemoteReminders других воркеров
+    """
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=1) as reader:
+        while True:
+            message = await loop.run_in_executor(reader, control.get)
+            if message is None:
+                return
+            action, payload = message
+            try:
+                getattr(reminders, action)(payload)
+            except Exception as e:
+                logging.log(level=logging.ERROR, msg=f"reminders: {e}")
+
+
+async def telegram_worker(
+    index: int, owner: bool, control: multiprocessing.Queue
+) -> tuple["Dispatcher", "Bot"]:
+    """
+    Воркер бота: сканер напоминаний (через выбор лидера между репликами) и
+    меню команд - только у владельца
+    """
+    from . import telebot
+    from .metrics import start_metrics_server
+    from .storage import close_redis
+
+    await telebot.accounts.warm()
+    if owner:
+        telebot.scheduler.start()
+        await telebot.leader.start()
+        try:
+            await telebot.on_startup()
+        except Exception as e:
+            # меню команд не повод перезапускать воркер с напоминаниями
+            logging.log(level=logging.ERROR, msg=f"worker: on_startup: {e}")
+        control_task = asyncio.create_task(serve_reminders(telebot.reminders, control))
+
+        async def stop_reminders():
+            control.put(None)
+            await control_task
+            await telebot.leader.stop()
+
+        telebot.dp.shutdown.register(stop_reminders)
+    else:
+        telebot.reminders = RemoteReminders(control)
+    telebot.dp.shutdown.register(telebot.database.drain)
+    telebot.dp.shutdown.register(close_redis)
+
+    if config.METRICS_PORT:
+        # у каждого процесса свои метрики и свой порт
+        metrics = await start_metrics_server(port=config.METRICS_PORT + index + 1)
+        telebot.dp.shutdown.register(metrics.cleanup)
+    return telebot.dp, telebot.bot
+
+
+def load_setup(path: str) -> Setup:
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+async def serve_worker(
+    index: int,
+    updates: multiprocessing.Queue,
+    control: multiprocessing.Queue,
+    owner: bool,
+    setup: str,
+) -> None:
+    dp, bot = await load_setup(setup)(index, owner, control)
+    lanes = ChatLanes(dp, bot, config.WORKER_CONCURRENCY, config.WORKER_QUEUE_SIZE)
+    loop = asyncio.get_running_loop()
+    try:
+        with ThreadPoolExecutor(max_workers=1) as reader:
+            while True:
+                await lanes.acquire()
+                message = await loop.run_in_executor(reader, updates.get)
+                if message is None:
+                    break
+                lanes.put(*message)
+        await lanes.drain()
+    finally:
+        await dp.emit_shutdown(bot=bot)
+        await bot.session.close()
+
+
+def run_worker(
+    index: int,
+    updates: multiprocessing.Queue,
+    control: multiprocessing.Queue,
+    owner: bool,
+    setup: str,
+) -> None:
+    # останавливает супервизор через очередь, а не Ctrl+C всей группе
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(serve_worker(index, updates, control, owner, setup))
+
+
+class Supervisor:
+    """
+    Запускает workers процессов и раздает им апдейты по хешу chat_id, так
+    что все апдейты одного чата обрабатывает один процесс по порядку (и его
+    кэши в памяти остаются согласованными). Напоминания сканирует только
+    воркер 0, остальные пересылают ему новые события.
+    """
+
+    def __init__(
+        self,
+        workers: int = config.WORKERS,
+        setup: str = "app.workers:telegram_worker",
+        maxsize: int = config.WORKER_QUEUE_SIZE,
+    ):
+        self.workers = workers
+        self.setup = setup
+        self._context = multiprocessing.get_context("spawn")
+        self._control = self._context.Queue()
+        self._queues = [self._context.Queue(maxsize) for _ in range(workers)]
+        self._processes: list[multiprocessing.Process | None] = [None] * workers
+        self._watch_task: asyncio.Task | None = None
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(
+            target=run_worker,
+            args=(index, self._queues[index], self._control, index == 0, self.setup),
+            name=f"worker-{index}",
+        )
+        process.start()
+        self._processes[index] = process
+
+    def put(self, data: dict) -> bool:
+        chat_id = update_chat_id(data)
+        try:
+            self._queues[jump_hash(chat_id, self.workers)].put_nowait((chat_id, data))
+        except queue.Full:
+            return False
+        return True
+
+    async def put_wait(self, data: dict) -> None:
+        while not self.put(data):
+            await asyncio.sleep(0.05)
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(1)
+            for index, process in enumerate(self._processes):
+                if not process.is_alive():
+                    logging.warning(
+                        f"supervisor: worker {index} exited with {process.exitcode}, restarting"
+                    )
+                    self._spawn(index)
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            self._spawn(index)
+        self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop(self, timeout: float = config.WEBHOOK_DRAIN_TIMEOUT) -> None:
+        """
+        Воркеры дорабатывают уже принятые апдейты и завершаются
+        """
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+        loop = asyncio.get_running_loop()
+        for updates in self._queues:
+            await loop.run_in_executor(None, updates.put, None)
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logging.warning(f"supervisor: terminating {process.name}")
+                process.terminate()
+
+
+async def poll_updates(
+    supervisor: Supervisor,
+    token: str,
+    timeout: int = 30,
+    api: str = "https://api.telegram.org",
+) -> None:
+    """
+    Long polling без aiogram: апдейты передаются воркерам как есть, без
+    разбора в pydantic в процессе супервизора. После ошибки (сеть, 409
+    от второго poller, 401, 429) пауза растет вдвое до POLL_BACKOFF_MAX,
+    retry_after из ответа Telegram имеет приоритет.
+    """
+    url = f"{api}/bot{token}/getUpdates"
+    offset = 0
+    backoff = 1.0
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.post(
+                    url,
+                    json={"offset": offset, "timeout": timeout},
+                    timeout=aiohttp.ClientTimeout(total=timeout + 10),
+                ) as response:
+                    body = await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                logging.warning(f"supervisor: getUpdates failed: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, POLL_BACKOFF_MAX)
+                continue
+
+            if not isinstance(body, dict) or not body.get("ok"):
+                body = body if isinstance(body, dict) else {}
+                retry_after = (body.get("parameters") or {}).get("retry_after")
+                delay = retry_after or backoff
+                logging.warning(
+                    f"supervisor: getUpdates error {body.get('error_code')}: "
+                    f"{body.get('description')}, retrying in {delay}s"
+                )
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, POLL_BACKOFF_MAX)
+                continue
+
+            backoff = 1.0
+            for data in body.get("result", []):
+                await supervisor.put_wait(data)
+                offset = data["update_id"] + 1
+
+
+async def run_supervisor(token: str) -> None:
+    supervisor = Supervisor()
+    supervisor.start()
+
+    runner = None
+    if config.BOT_MODE == "webhook":
+        from .webhook import create_app
+
+        runner = web.AppRunner(create_app(supervisor))
+        await runner.setup()
+        await web.TCPSite(runner, config.WEBHOOK_HOST, config.WEBHOOK_PORT).start()
+        if config.WEBHOOK_BASE_URL:
+            from aiogram import Bot
+
+            bot = Bot(token=token)
+            try:
+                await bot.set_webhook(
+                    config.WEBHOOK_BASE_URL.rstrip("/") + config.WEBHOOK_PATH,
+                    secret_token=config.WEBHOOK_SECRET or None,
+                    max_connections=config.WEBHOOK_MAX_CONNECTIONS,
+                )
+            finally:
+                await bot.session.close()
+        source = None
+    else:
+        source = asyncio.create_task(poll_updates(supervisor, token))
+    logging.info(f"supervisor: {supervisor.workers} workers, {config.BOT_MODE}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await stop.wait()
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+        if source is not None:
+            source.cancel()
+            await asyncio.gather(source, return_exceptions=True)
+        await supervisor.stop()
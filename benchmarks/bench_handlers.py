@@ -0,0 +1,274 @@
+"""
+Нагрузочный прогон хендлеров бота без сети.
+
+Апдейты /today, /week, /add проходят через dp.feed_update (фильтры и
+middleware), check_user и check_events вызываются напрямую. Bot работает
+через MockSession, которая отвечает на запросы Bot API без Telegram.
+База засевается до каждого размера из --sizes (события на --accounts
+аккаунтов), выбор чатов и дат детерминирован --seed.
+
+Результат - ops/s, p50/p99 и SQL-запросов на вызов, сохраняется в JSON:
+
+    python -m benchmarks.bench_handlers --sizes 1000,100000,1000000
+    python -m benchmarks.bench_handlers --compare bench_handlers-abc1234.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault(
+    "DATABASE_NAME", os.path.join(tempfile.mkdtemp(prefix="bench_"), "bench")
+)
+
+from aiogram import types  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.methods import SendMessage  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+
+from app import telebot  # noqa: E402
+from app.cache import response_cache  # noqa: E402
+from app.database.base import AccountData, Event, db  # noqa: E402
+from app.delivery import ReminderDelivery  # noqa: E402
+from app.storage import get_account_cache  # noqa: E402
+
+from .updates import make_update  # noqa: E402
+
+SCENARIOS = ("check_user", "today", "week", "add", "check_events")
+
+
+class MockSession(BaseSession):
+    """
+    Сессия Bot без сети: SendMessage возвращает сообщение, остальное - True
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.requests = 0
+
+    async def make_request(self, bot, method, timeout=None):
+        self.requests += 1
+        if isinstance(method, SendMessage):
+            return types.Message(
+                message_id=self.requests,
+                date=datetime.now(),
+                chat=types.Chat(id=int(method.chat_id), type="private"),
+                text=method.text,
+            )
+        return True
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(db.engine, "after_cursor_execute", self.after_cursor_execute)
+
+    def after_cursor_execute(self, *args):
+        self.count += 1
+
+
+def seed(rng: random.Random, accounts: int, current: int, target: int) -> None:
+    now = datetime.now()
+    with db.engine.begin() as connection:
+        if current == 0:
+            connection.execute(
+                insert(AccountData), [{"chat_id": str(a)} for a in range(accounts)]
+            )
+        for offset in range(current, target, 50_000):
+            connection.execute(
+                insert(Event),
+                [
+                    {
+                        "event_name": "seeded",
+                        "event_date": now
+                        + timedelta(minutes=rng.randint(-260_000, 260_000)),
+                        "user_id": str(rng.randrange(accounts)),
+                        "notified": False,
+                    }
+                    for _ in range(min(50_000, target - offset))
+                ],
+            )
+
+
+def message(update_id: int, chat_id: int, text: str) -> types.Update:
+    return types.Update.model_validate(
+        make_update(update_id, chat_id, text), context={"bot": telebot.bot}
+    )
+
+
+async def run_scenario(
+    name: str,
+    rng: random.Random,
+    counter: QueryCounter,
+    accounts: int,
+    calls: int,
+    batch: int,
+) -> tuple[list[float], int, int]:
+    """
+    Возвращает задержки вызовов, число операций и SQL-запросов
+    """
+    latencies = []
+    ops = 0
+    queries = 0
+    for i in range(calls):
+        chat_id = rng.randrange(accounts)
+        if name == "check_events":
+            now = datetime.now()
+            added = [
+                await telebot.database.add_event(
+                    str(rng.randrange(accounts)),
+                    telebot.EventCreate(
+                        event_name="due", event_date=now + timedelta(minutes=30)
+                    ),
+                )
+                for _ in range(batch)
+            ]
+            before = counter.count
+            started = time.perf_counter()
+            await telebot.check_events(added)
+            ops += batch
+        elif name == "check_user":
+            update = message(i + 1, chat_id, "/start")
+            before = counter.count
+            started = time.perf_counter()
+            await telebot.check_user(update.message)
+            ops += 1
+        else:
+            text = {"add": "/add Контрольная 2031-01-01 9:00"}.get(name, f"/{name}")
+            update = message(i + 1, chat_id, text)
+            before = counter.count
+            started = time.perf_counter()
+            await telebot.dp.feed_update(telebot.bot, update)
+            ops += 1
+        latencies.append(time.perf_counter() - started)
+        queries += counter.count - before
+    return latencies, ops, queries
+
+
+def summarize(name: str, size: int, latencies: list[float], ops: int, queries: int):
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "size": size,
+        "scenario": name,
+        "calls": len(latencies),
+        "ops": ops,
+        "ops_per_sec": ops / sum(latencies),
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "queries_per_call": queries / len(latencies),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: list[dict], baseline: dict | None = None) -> None:
+    header = f"{'size':>9} {'scenario':<13}{'ops/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'q/call':>8}"
+    print(header + ("  vs base" if baseline else ""))
+    for row in results:
+        line = (
+            f"{row['size']:>9} {row['scenario']:<13}{row['ops_per_sec']:>10.0f}"
+            f"{row['p50_ms']:>9.2f}{row['p99_ms']:>9.2f}{row['queries_per_call']:>8.1f}"
+        )
+        old = (baseline or {}).get((row["size"], row["scenario"]))
+        if old:
+            line += f"  x{row['ops_per_sec'] / old['ops_per_sec']:.2f}"
+        print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument(
+        "--batch", type=int, default=100, help="events per check_events"
+    )
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None, help="previous results JSON")
+    args = parser.parse_args()
+
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+    telebot.bot.session = MockSession()
+    # без лимитов Telegram: меряем код, а не token bucket
+    telebot.delivery = ReminderDelivery(
+        telebot.bot, telebot.database, global_rate=1e9, chat_rate=1e9
+    )
+    counter = QueryCounter()
+
+    rng = random.Random(args.seed)
+    results = []
+    current = 0
+    for size in map(int, args.sizes.split(",")):
+        print(f"seeding {size} events for {args.accounts} accounts...")
+        seed(rng, args.accounts, current, size)
+        current = size
+        # каждый размер - с холодными кэшами ответов и аккаунтов
+        response_cache.clear()
+        telebot.accounts = get_account_cache(telebot.database)
+        for name in args.scenarios.split(","):
+            calls = max(args.calls // 10, 2) if name == "check_events" else args.calls
+            latencies, ops, queries = await run_scenario(
+                name,
+                random.Random(args.seed),
+                counter,
+                args.accounts,
+                calls,
+                args.batch,
+            )
+            results.append(summarize(name, size, latencies, ops, queries))
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "accounts": args.accounts,
+        "seed": args.seed,
+        "results": results,
+    }
+    output = args.output or f"bench_handlers-{commit}.json"
+    with open(output, "w", encoding="utf-8") as stream:
+        json.dump(report, stream, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as stream:
+            baseline = {
+                (row["size"], row["scenario"]): row
+                for row in json.load(stream)["results"]
+            }
+    print_results(results, baseline)
+    print(f"saved to {output}")
+    await telebot.bot.session.close()
+    telebot.database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Планы и время запросов get_events / get_user_events на синтетической
+таблице event без индексов и с индексами из миграции 1.
+
+    python -m benchmarks.bench_indexes --events 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault(
+    "DATABASE_NAME", os.path.join(tempfile.mkdtemp(prefix="bench_"), "bench")
+)
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from app.database import SQLDataBase  # noqa: E402
+from app.database.base import AccountData, Event, db  # noqa: E402
+
+INDEXES = ("ix_event_notified_date", "ix_event_user_date")
+
+GET_EVENTS_SQL = (
+    "SELECT * FROM event WHERE event_date >= :start AND event_date <= :end "
+    "AND notified = 0 ORDER BY event_date"
+)
+GET_USER_EVENTS_SQL = (
+    "SELECT * FROM event WHERE user_id = :user_id AND event_date >= :start "
+    "AND event_date < :end ORDER BY event_date"
+)
+
+
+def seed(events: int, users: int, batch: int = 50_000):
+    now = datetime.now()
+    rng = random.Random(42)
+    with db.engine.begin() as connection:
+        connection.execute(
+            insert(AccountData), [{"chat_id": str(u)} for u in range(users)]
+        )
+        for offset in range(0, events, batch):
+            rows = []
+            for _ in range(min(batch, events - offset)):
+                event_date = now + timedelta(minutes=rng.randint(-300_000, 300_000))
+                rows.append(
+                    {
+                        "event_name": "synthetic",
+                        "event_date": event_date,
+                        "user_id": str(rng.randrange(users)),
+                        "notified": event_date < now,
+                    }
+                )
+            connection.execute(insert(Event), rows)
+        connection.execute(text("ANALYZE"))
+
+
+def explain(sql: str, params: dict) -> str:
+    with db.engine.connect() as connection:
+        rows = connection.execute(text("EXPLAIN QUERY PLAN " + sql), params)
+        return "; ".join(row[-1] for row in rows)
+
+
+def timed(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def run(database: SQLDataBase, repeat: int) -> None:
+    now = datetime.now()
+    window = {"start": now, "end": now + timedelta(hours=1)}
+    user_window = {"user_id": "7", "start": now, "end": now + timedelta(days=7)}
+
+    print("  get_events plan:     ", explain(GET_EVENTS_SQL, window))
+    print("  get_user_events plan:", explain(GET_USER_EVENTS_SQL, user_window))
+    print(
+        f"  get_events      {timed(lambda: database.get_events(**window), repeat):8.2f} ms"
+    )
+    print(
+        "  get_user_events "
+        f"{timed(lambda: database.get_user_events(**user_window), repeat):8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"seeding {args.events} events for {args.users} users...")
+    seed(args.events, args.users)
+    database = SQLDataBase()
+
+    with db.engine.begin() as connection:
+        for name in INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    print("without indexes:")
+    run(database, args.repeat)
+
+    with db.engine.begin() as connection:
+        for index in Event.__table__.indexes:
+            index.create(connection, checkfirst=True)
+        connection.execute(text("ANALYZE"))
+    print("with indexes:")
+    run(database, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Повторяющиеся события: одна строка серии против материализованных строк.
+
+Для --users пользователей с --series еженедельными событиями на --weeks
+недель сравнивает размер базы и время get_user_events (неделя) и
+get_events (окно напоминаний на час).
+
+    python -m benchmarks.bench_recurrence --users 2000 --series 3 --weeks 52
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault(
+    "DATABASE_NAME", os.path.join(tempfile.mkdtemp(prefix="bench_"), "bench")
+)
+
+from sqlalchemy import delete, insert, text  # noqa: E402
+
+from app.database import SQLDataBase  # noqa: E402
+from app.database.base import AccountData, Event, EventSeries, db  # noqa: E402
+
+
+def database_size() -> int:
+    with db.engine.connect() as connection:
+        connection.execute(text("VACUUM"))
+        page_count = connection.execute(text("PRAGMA page_count")).scalar()
+        page_size = connection.execute(text("PRAGMA page_size")).scalar()
+    return page_count * page_size
+
+
+def seed_rows(users: int, series: int, weeks: int, dtstart: datetime) -> None:
+    with db.engine.begin() as connection:
+        rows = [
+            {
+                "user_id": str(user),
+                "event_name": f"lesson {n}",
+                "event_date": dtstart + timedelta(days=n, weeks=week),
+                "notified": False,
+            }
+            for user in range(users)
+            for n in range(series)
+            for week in range(weeks)
+        ]
+        connection.execute(insert(Event.__table__), rows)
+
+
+def seed_series(users: int, series: int, weeks: int, dtstart: datetime) -> None:
+    with db.engine.begin() as connection:
+        rows = [
+            {
+                "user_id": str(user),
+                "event_name": f"lesson {n}",
+                "dtstart": dtstart + timedelta(days=n),
+                "rule": f"FREQ=WEEKLY;COUNT={weeks}",
+                "until": dtstart + timedelta(days=n, weeks=weeks - 1),
+            }
+            for user in range(users)
+            for n in range(series)
+        ]
+        connection.execute(insert(EventSeries.__table__), rows)
+
+
+def measure(database: SQLDataBase, users: int, repeat: int) -> dict[str, float]:
+    now = datetime.now()
+    week_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    started = time.perf_counter()
+    for i in range(repeat):
+        database.get_user_events(
+            str(i % users), week_start, week_start + timedelta(weeks=1)
+        )
+    user_ms = (time.perf_counter() - started) / repeat * 1000
+
+    started = time.perf_counter()
+    database.get_events(now, now + timedelta(hours=1))
+    scan_ms = (time.perf_counter() - started) * 1000
+
+    return {"size_kb": database_size() / 1024, "user_ms": user_ms, "scan_ms": scan_ms}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--series", type=int, default=3)
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    database = SQLDataBase()
+    with db.engine.begin() as connection:
+        connection.execute(
+            insert(AccountData.__table__),
+            [{"chat_id": str(user)} for user in range(args.users)],
+        )
+    baseline = database_size()
+    dtstart = datetime.now().replace(second=0, microsecond=0) - timedelta(weeks=8)
+
+    seed_rows(args.users, args.series, args.weeks, dtstart)
+    rows = measure(database, args.users, args.repeat)
+    with db.engine.begin() as connection:
+        connection.execute(delete(Event))
+
+    seed_series(args.users, args.series, args.weeks, dtstart)
+    series = measure(database, args.users, args.repeat)
+
+    print(f"{'':<16}{'rows':>12}{'series':>12}")
+    print(
+        f"{'events stored':<16}{args.users * args.series * args.weeks:>12}"
+        f"{args.users * args.series:>12}"
+    )
+    print(
+        f"{'size, KB':<16}{rows['size_kb'] - baseline / 1024:>12.0f}"
+        f"{series['size_kb'] - baseline / 1024:>12.0f}"
+    )
+    print(f"{'user week, ms':<16}{rows['user_ms']:>12.3f}{series['user_ms']:>12.3f}")
+    print(f"{'hour scan, ms':<16}{rows['scan_ms']:>12.3f}{series['scan_ms']:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Стоимость строки на путях чтения get_events и get_user_events: прежний путь
+(объекты ORM / кортежи + pydantic-модель на строку) против текущего
+(select по колонкам + dataclass со __slots__).
+
+Для каждого размера из --sizes база засевается событиями одного
+пользователя в окне get_events, результат - строк/с (лучший из --repeat)
+и байт на строку результата по tracemalloc:
+
+    python -m benchmarks.bench_rows --sizes 10000,100000
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+os.environ.setdefault(
+    "DATABASE_NAME", os.path.join(tempfile.mkdtemp(prefix="rows_"), "rows")
+)
+
+from pydantic import BaseModel  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import SQLDataBase  # noqa: E402
+from app.database.base import AccountData, Event, db  # noqa: E402
+from app.database.sql import handle_db_query  # noqa: E402
+
+
+class PydanticNotification(BaseModel):
+    event_id: int
+    chat_id: str
+    event_name: str
+    event_date: datetime
+    series_id: int | None = None
+
+
+class PydanticResponse(BaseModel):
+    event_name: str
+    event_day: str
+    event_time: str
+
+
+@handle_db_query
+def legacy_get_events(start, end, session=None):
+    query = (
+        session.query(Event)
+        .filter(
+            Event.event_date >= start,
+            Event.event_date <= end,
+            Event.notified == False,
+        )
+        .order_by(Event.event_date)
+        .all()
+    )
+    return [
+        PydanticNotification(
+            event_id=event.id,
+            chat_id=event.user_id,
+            event_name=event.event_name,
+            event_date=event.event_date,
+        )
+        for event in query
+    ]
+
+
+@handle_db_query
+def legacy_get_user_events(user_id, start, end, session=None):
+    rows = (
+        session.query(Event.event_name, Event.event_date)
+        .filter(
+            Event.user_id == user_id,
+            Event.event_date >= start,
+            Event.event_date < end,
+        )
+        .order_by(Event.event_date)
+        .all()
+    )
+    return [
+        PydanticResponse(
+            event_name=event_name,
+            event_day=f"{event_date.day}.{event_date.month}",
+            event_time=f"{event_date.hour}:{event_date.minute}",
+        )
+        for event_name, event_date in rows
+    ]
+
+
+def seed(current: int, target: int, now: datetime) -> None:
+    with db.engine.begin() as connection:
+        if current == 0:
+            connection.execute(insert(AccountData), [{"chat_id": "bench"}])
+        connection.execute(
+            insert(Event),
+            [
+                {
+                    "event_name": f"event {i}",
+                    "event_date": now + timedelta(seconds=i),
+                    "user_id": "bench",
+                    "notified": False,
+                }
+                for i in range(current, target)
+            ],
+        )
+
+
+def measure(call, repeat: int) -> tuple[int, float, float]:
+    """
+    Число строк, строк/с и байт на строку удерживаемого результата
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = call()
+        best = min(best, time.perf_counter() - started)
+        del rows
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = call()
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return len(rows), len(rows) / best, retained / max(len(rows), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    database = SQLDataBase()
+    now = datetime.now().replace(microsecond=0) + timedelta(hours=1)
+    cases = {
+        "get_events": (
+            lambda start, end: legacy_get_events(start, end),
+            lambda start, end: database.get_events(start, end),
+        ),
+        "get_user_events": (
+            lambda start, end: legacy_get_user_events("bench", start, end),
+            lambda start, end: database.get_user_events("bench", start, end),
+        ),
+    }
+
+    print(
+        f"{'rows':>8} {'path':<16}{'old rows/s':>12}{'new rows/s':>12}"
+        f"{'speedup':>9}{'old B/row':>11}{'new B/row':>11}"
+    )
+    current = 0
+    for size in map(int, args.sizes.split(",")):
+        seed(current, size, now)
+        current = size
+        start, end = now, now + timedelta(seconds=size)
+        for name, (old, new) in cases.items():
+            rows, old_rate, old_bytes = measure(lambda: old(start, end), args.repeat)
+            new_rows, new_rate, new_bytes = measure(
+                lambda: new(start, end), args.repeat
+            )
+            assert rows == new_rows == size, (rows, new_rows)
+            print(
+                f"{size:>8} {name:<16}{old_rate:>12.0f}{new_rate:>12.0f}"
+                f"{new_rate / old_rate:>8.2f}x{old_bytes:>11.0f}{new_bytes:>11.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
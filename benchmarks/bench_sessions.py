@@ -0,0 +1,84 @@
+"""
+Сравнение пропускной способности SQLDataBase до и после общей фабрики сессий.
+
+"before" - новый sessionmaker на каждый запрос и SQLite без pragma,
+"after"  - текущий app.database.base.SQLAlchemy.
+
+    python -m benchmarks.bench_sessions --queries 2000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault(
+    "DATABASE_NAME", os.path.join(tempfile.mkdtemp(prefix="bench_"), "bench")
+)
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+from app.core import config  # noqa: E402
+from app.database import sql  # noqa: E402
+from app.database.base import Base, db, get_db_config  # noqa: E402
+from app.database.models import EventCreate  # noqa: E402
+
+
+class LegacySQLAlchemy:
+    """Поведение до изменения: sessionmaker создается на каждый вызов"""
+
+    def __init__(self, database: str):
+        # отдельный файл: journal_mode=WAL сохраняется в самой базе
+        self.engine = create_engine(get_db_config(database=database))
+        Base.metadata.create_all(self.engine)
+
+    def get_session(self, **kwargs) -> Session:
+        _Session = sessionmaker(bind=self.engine)
+        return _Session(**kwargs)
+
+
+def measure(database: sql.SQLDataBase, queries: int) -> dict[str, float]:
+    now = datetime.now()
+    results = {}
+
+    started = time.perf_counter()
+    for i in range(queries):
+        database.add_event(
+            "bench", EventCreate(event_name=f"e{i}", event_date=now + timedelta(i))
+        )
+    results["add_event"] = queries / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for i in range(queries):
+        database.get_user_events("bench", now, now + timedelta(days=7))
+    results["get_user_events"] = queries / (time.perf_counter() - started)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    database = sql.SQLDataBase()
+    database.add_account("bench")
+
+    sql.db = LegacySQLAlchemy(config.DATABASE_NAME + "_legacy")
+    before = measure(database, args.queries)
+
+    sql.db = db
+    after = measure(database, args.queries)
+
+    print(f"{'method':<18}{'before q/s':>14}{'after q/s':>14}{'x':>8}")
+    for name in before:
+        print(
+            f"{name:<18}{before[name]:>14.0f}{after[name]:>14.0f}"
+            f"{after[name] / before[name]:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
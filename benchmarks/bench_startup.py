@@ -0,0 +1,119 @@
+"""
+Время холодного старта по интерфейсам.
+
+Каждая цель импортируется в новом процессе с python -X importtime (по
+умолчанию --repeat 5, берется медиана). Отчет: суммарное время импорта,
+время процесса целиком, какие тяжелые пакеты загружены и самые дорогие
+модули по собственному времени:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --targets gradio --top 30
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# что делает процесс при старте в каждом режиме, без запуска сети
+TARGETS = {
+    "main": ("telegram", "import app.main"),
+    "telegram": ("telegram", "import app.main, app.telebot"),
+    # напоминания в режиме gradio отправляет бот из app.telebot
+    "gradio": ("gradio", "import app.main, app.gradio, app.telebot"),
+    "supervisor": ("telegram", "import app.main, app.workers"),
+    "first_db": (
+        "telegram",
+        "from app.database.base import db; db.engine",
+    ),
+}
+
+HEAVY = ("aiogram", "gradio", "apscheduler", "redis", "sqlalchemy", "aiohttp")
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int, int]]:
+    """
+    Модуль -> (собственное время мкс, накопленное мкс, глубина вложенности)
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(own), int(cumulative), depth)
+    return modules
+
+
+def run_target(interface: str, code: str, database: str) -> dict:
+    env = dict(os.environ, INTERFACE=interface, DATABASE_NAME=database)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1:] or ["failed"]
+        return {"error": error[0]}
+    modules = parse_importtime(result.stderr)
+    return {
+        "wall": wall,
+        "imports": sum(c for _, c, depth in modules.values() if depth == 0) / 1e6,
+        "modules": modules,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--targets", default=",".join(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(prefix="startup_"), "startup")
+    report = {}
+    for name in args.targets.split(","):
+        interface, code = TARGETS[name]
+        runs = [run_target(interface, code, database) for _ in range(args.repeat)]
+        if "error" in runs[0]:
+            print(f"{name:<11} {runs[0]['error']}")
+            report[name] = {"error": runs[0]["error"]}
+            continue
+
+        modules = runs[-1]["modules"]
+        loaded = [
+            package
+            for package in HEAVY
+            if any(m == package or m.startswith(package + ".") for m in modules)
+        ]
+        report[name] = {
+            "wall_s": statistics.median(run["wall"] for run in runs),
+            "imports_s": statistics.median(run["imports"] for run in runs),
+            "modules": len(modules),
+            "loaded": loaded,
+        }
+        row = report[name]
+        print(
+            f"{name:<11} process {row['wall_s']:6.3f}s  imports {row['imports_s']:6.3f}s"
+            f"  {row['modules']:>5} modules  [{', '.join(loaded)}]"
+        )
+        for module, (own, _, _) in sorted(
+            modules.items(), key=lambda item: item[1][0], reverse=True
+        )[: args.top]:
+            print(f"    {own / 1000:8.1f} ms  {module}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as stream:
+            json.dump(report, stream, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Пропускная способность записи: каждая запись своей транзакцией против
+буфера WriteBehind (app.database.writer) при 1/10/100 одновременных
+писателях. Писатели вызывают AsyncSQLDataBase.add_event и ждут commit.
+
+    python -m benchmarks.bench_writes
+    python -m benchmarks.bench_writes --synchronous FULL --writes 2000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault(
+    "DATABASE_NAME", os.path.join(tempfile.mkdtemp(prefix="writes_"), "writes")
+)
+
+
+async def run(database, writers: int, writes: int) -> tuple[float, float, float]:
+    """
+    Возвращает записей/с, p50 и p99 задержки в секундах
+    """
+    from app.database import EventCreate
+
+    latencies: list[float] = []
+    date = datetime.now() + timedelta(days=3650)
+    remaining = iter(range(writes))
+
+    async def writer(index: int):
+        for i in remaining:
+            event = EventCreate(event_name=f"w{i}", event_date=date)
+            started = time.perf_counter()
+            await database.add_event(str(index), event)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(index) for index in range(writers)))
+    elapsed = time.perf_counter() - started
+    quantiles = statistics.quantiles(latencies, n=100)
+    return writes / elapsed, quantiles[49], quantiles[98]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", default="1,10,100")
+    parser.add_argument("--writes", type=int, default=5000, help="per run")
+    parser.add_argument(
+        "--synchronous", default=None, help="SQLITE_SYNCHRONOUS, e.g. FULL"
+    )
+    args = parser.parse_args()
+    if args.synchronous:
+        os.environ["SQLITE_SYNCHRONOUS"] = args.synchronous
+
+    from app.database import AsyncSQLDataBase
+    from app.metrics import WRITE_BATCH_ROWS
+
+    direct = AsyncSQLDataBase()
+    direct.writer = None
+    buffered = AsyncSQLDataBase()
+    if buffered.writer is None:
+        sys.exit("WRITE_BATCH_ROWS <= 1: the write buffer is disabled")
+
+    print(
+        f"{'writers':>8}  {'mode':<9}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}"
+        f"{'rows/commit':>13}"
+    )
+    for writers in map(int, args.writers.split(",")):
+        for mode, database in (("direct", direct), ("buffered", buffered)):
+            before = WRITE_BATCH_ROWS.render()
+            rate, p50, p99 = await run(database, writers, args.writes)
+            per_commit = 1.0
+            if database is buffered:
+                # среднее по гистограмме: сумма строк / число пачек за прогон
+                per_commit = batch_average(before, WRITE_BATCH_ROWS.render())
+            print(
+                f"{writers:>8}  {mode:<9}{rate:>10.0f}{p50 * 1000:>9.2f}"
+                f"{p99 * 1000:>9.2f}{per_commit:>13.1f}"
+            )
+    await buffered.drain()
+    direct.close()
+    buffered.close()
+
+
+def batch_average(before: list[str], after: list[str]) -> float:
+    def totals(lines: list[str]) -> tuple[float, float]:
+        values = dict(line.rsplit(" ", 1) for line in lines if line[0] != "#")
+        return (
+            float(values.get("db_write_batch_rows_sum", 0)),
+            float(values.get("db_write_batch_rows_count", 0)),
+        )
+
+    rows_before, batches_before = totals(before)
+    rows_after, batches_after = totals(after)
+    batches = batches_after - batches_before
+    return (rows_after - rows_before) / batches if batches else 0.0
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,174 @@
+"""
+Нагрузочный прогон веб-интерфейса (INTERFACE=gradio): одновременные
+клиенты вызывают API gradio (schedule и add_event в пропорции --writes),
+результат - запросов/с и p50/p99 на каждое число клиентов.
+
+    # против запущенного интерфейса
+    python -m benchmarks.gradio_load --url http://localhost:7860
+
+    # поднимает python -m app.main с временной базой, засеянной --events
+    python -m benchmarks.gradio_load --local --clients 1,10,50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import aiohttp
+
+
+def seed(database: str, events: int, users: int) -> None:
+    os.environ["DATABASE_NAME"] = database
+    from sqlalchemy import insert
+
+    from app.database.base import AccountData, Event, db
+
+    rng = random.Random(42)
+    now = datetime.now()
+    with db.engine.begin() as connection:
+        connection.execute(
+            insert(AccountData), [{"chat_id": str(u)} for u in range(users)]
+        )
+        connection.execute(
+            insert(Event),
+            [
+                {
+                    "event_name": "seeded",
+                    # позже окна напоминаний, чтобы сервер не ходил в Telegram
+                    "event_date": now
+                    + timedelta(hours=2, minutes=rng.randrange(10_000)),
+                    "user_id": str(rng.randrange(users)),
+                    "notified": False,
+                }
+                for _ in range(events)
+            ],
+        )
+    db.engine.dispose()
+
+
+def start_local(port: int, events: int, users: int) -> subprocess.Popen:
+    database = os.path.join(tempfile.mkdtemp(prefix="gradio_"), "gradio")
+    seed(database, events, users)
+    env = dict(
+        os.environ,
+        INTERFACE="gradio",
+        DATABASE_NAME=database,
+        GRADIO_HOST="127.0.0.1",
+        GRADIO_PORT=str(port),
+    )
+    return subprocess.Popen([sys.executable, "-m", "app.main"], env=env)
+
+
+async def wait_ready(url: str, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url + "/gradio_api/info") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"{url} is not ready")
+
+
+async def call(session: aiohttp.ClientSession, url: str, api: str, data: list):
+    """
+    Вызов через очередь gradio: POST ставит задачу, SSE отдает результат
+    """
+    async with session.post(f"{url}/gradio_api/call/{api}", json={"data": data}) as r:
+        event_id = (await r.json())["event_id"]
+    async with session.get(f"{url}/gradio_api/call/{api}/{event_id}") as r:
+        body = await r.text()
+    # в потоке могут быть heartbeat до результата
+    if "event: complete" not in body:
+        raise RuntimeError(body.strip().splitlines()[-1] if body else "empty")
+    data = body.split("event: complete", 1)[1].split("data:", 1)[1]
+    return json.loads(data.split("\n", 1)[0])
+
+
+async def run(
+    url: str, clients: int, requests: int, writes: float, users: int
+) -> tuple[float, float, float, int]:
+    """
+    Возвращает запросов/с, p50 и p99 в секундах и число ошибок
+    """
+    latencies: list[float] = []
+    errors = 0
+    rng = random.Random(clients)
+    date = (datetime.now() + timedelta(days=3650)).strftime("%Y-%m-%d %H:%M")
+    remaining = iter(range(requests))
+
+    async def client(session: aiohttp.ClientSession):
+        nonlocal errors
+        for _ in remaining:
+            user = str(rng.randrange(users))
+            if rng.random() < writes:
+                api, data = "add_event", [user, "load", date]
+            else:
+                api, data = "schedule", [user, rng.choice(["today", "week"])]
+            started = time.perf_counter()
+            try:
+                await call(session, url, api, data)
+            except (aiohttp.ClientError, RuntimeError, KeyError):
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    connector = aiohttp.TCPConnector(limit=clients * 2)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await asyncio.gather(*(client(session) for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return len(latencies) / elapsed, quantiles[49], quantiles[98], errors
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:7860")
+    parser.add_argument("--local", action="store_true")
+    parser.add_argument("--port", type=int, default=7869)
+    parser.add_argument("--clients", default="1,10,50")
+    parser.add_argument("--requests", type=int, default=500, help="per client level")
+    parser.add_argument("--writes", type=float, default=0.2)
+    parser.add_argument("--events", type=int, default=1_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    args = parser.parse_args()
+
+    url = args.url.rstrip("/")
+    server = None
+    if args.local:
+        server = start_local(args.port, args.events, args.users)
+        url = f"http://127.0.0.1:{args.port}"
+    try:
+        await wait_ready(url)
+        # прогрев: первые вызовы поднимают пул базы и кэши gradio
+        await run(url, 1, 20, args.writes, args.users)
+        print(f"{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for clients in map(int, args.clients.split(",")):
+            rate, p50, p99, errors = await run(
+                url, clients, args.requests, args.writes, args.users
+            )
+            print(
+                f"{clients:>8}{rate:>10.1f}{p50 * 1000:>10.1f}{p99 * 1000:>10.1f}"
+                f"{errors:>8}"
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""
+Прогон app.workers.Supervisor на синтетических апдейтах без Telegram:
+хендлер валидирует и рендерит события (CPU-нагрузка как у /week) и
+проверяет, что апдейты каждого чата пришли по порядку.
+
+    python -m benchmarks.sharded_load --workers 1,2,4 --updates 20000
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from aiogram import Bot, Dispatcher, types
+
+from app.workers import Supervisor
+
+from .updates import generate_updates
+
+# событий, которые хендлер валидирует и рендерит на каждый апдейт
+EVENTS_PER_UPDATE = 20
+
+
+async def local_worker(index: int, owner: bool, control) -> tuple[Dispatcher, Bot]:
+    from app.database.models import EventCreate
+
+    dp = Dispatcher()
+    last: dict[int, int] = {}
+    stats = {"handled": 0, "out_of_order": 0}
+    now = datetime.now()
+
+    @dp.message()
+    async def handle(message: types.Message):
+        chat_id = message.chat.id
+        if last.get(chat_id, 0) >= message.message_id:
+            stats["out_of_order"] += 1
+        last[chat_id] = message.message_id
+        events = [
+            EventCreate(event_name=f"{message.text} {i}", event_date=now + timedelta(i))
+            for i in range(EVENTS_PER_UPDATE)
+        ]
+        "\n".join(f"{e.event_name} - {e.event_date:%Y-%m-%d %H:%M}" for e in events)
+        stats["handled"] += 1
+
+    @dp.shutdown()
+    async def report():
+        role = "owner" if owner else "worker"
+        print(
+            f"  worker {index} ({role}): {stats['handled']} updates, "
+            f"{len(last)} chats, {stats['out_of_order']} out of order"
+        )
+
+    return dp, Bot(token="42:local")
+
+
+async def run(workers: int, count: int, chats: int) -> float:
+    supervisor = Supervisor(
+        workers=workers, setup="benchmarks.sharded_load:local_worker"
+    )
+    supervisor.start()
+    # прогрев: воркеры импортируют модули и поднимаются
+    await asyncio.sleep(3)
+
+    started = time.perf_counter()
+    for data in generate_updates(count, chats):
+        await supervisor.put_wait(data)
+    await supervisor.stop(timeout=600)
+    return count / (time.perf_counter() - started)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--updates", type=int, default=20_000)
+    parser.add_argument("--chats", type=int, default=1_000)
+    args = parser.parse_args()
+
+    results = {}
+    for workers in map(int, args.workers.split(",")):
+        print(f"{workers} workers:")
+        results[workers] = await run(workers, args.updates, args.chats)
+
+    print(f"{'workers':<10}{'updates/sec':>14}")
+    for workers, rate in results.items():
+        print(f"{workers:<10}{rate:>14.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
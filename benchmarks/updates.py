@@ -0,0 +1,30 @@
+"""
+Генератор синтетических апдейтов Telegram для нагрузочных прогонов.
+"""
+
+import random
+import time
+
+COMMANDS = ["/today", "/tomorrow", "/week", "/help", "/add Контрольная 2030-01-01 9:00"]
+
+
+def make_update(update_id: int, chat_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "bench"},
+            "text": text,
+            "entities": [
+                {"type": "bot_command", "offset": 0, "length": len(text.split()[0])}
+            ],
+        },
+    }
+
+
+def generate_updates(count: int, chats: int, seed: int = 42):
+    rng = random.Random(seed)
+    for update_id in range(1, count + 1):
+        yield make_update(update_id, rng.randint(1, chats), rng.choice(COMMANDS))
@@ -0,0 +1,93 @@
+"""
+Нагрузочный прогон webhook-режима: POST синтетических апдейтов,
+результат - updates/sec и p50/p99 задержки ответа.
+
+    # против запущенного бота (BOT_MODE=webhook)
+    python -m benchmarks.webhook_load --url http://localhost:8080/webhook
+
+    # без Telegram: поднимает app.webhook в процессе с пустым хендлером
+    python -m benchmarks.webhook_load --local
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+from .updates import generate_updates
+
+
+async def local_server(port: int):
+    from aiogram import Bot, Dispatcher, types
+    from aiohttp import web
+
+    from app.webhook import UpdateQueue, create_app
+
+    dp = Dispatcher()
+
+    @dp.message()
+    async def noop(message: types.Message):
+        await asyncio.sleep(0)
+
+    bot = Bot(token="42:local")
+    updates = UpdateQueue(dp, bot)
+    updates.start()
+    runner = web.AppRunner(create_app(updates, secret=""))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner, updates, bot
+
+
+async def run(url: str, count: int, chats: int, concurrency: int) -> None:
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    payloads = iter(list(generate_updates(count, chats)))
+
+    async def client(session: aiohttp.ClientSession):
+        for payload in payloads:
+            started = time.perf_counter()
+            async with session.post(url, json=payload) as response:
+                await response.read()
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"updates:     {count} ({statuses})")
+    print(f"updates/sec: {count / elapsed:.0f}")
+    print(f"p50:         {quantiles[49] * 1000:.2f} ms")
+    print(f"p99:         {quantiles[98] * 1000:.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8080/webhook")
+    parser.add_argument("--local", action="store_true")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--updates", type=int, default=10_000)
+    parser.add_argument("--chats", type=int, default=1_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    url = args.url
+    if args.local:
+        runner, updates, bot = await local_server(args.port)
+        url = f"http://127.0.0.1:{args.port}/webhook"
+
+    await run(url, args.updates, args.chats, args.concurrency)
+
+    if args.local:
+        await runner.cleanup()
+        await updates.drain()
+        await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
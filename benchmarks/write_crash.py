@@ -0,0 +1,119 @@
+"""
+Проверка сохранности при падении процесса с буфером записи WriteBehind.
+
+Дочерний процесс пишет события через AsyncSQLDataBase.add_event из
+--writers одновременных задач и после каждого подтвержденного await
+дописывает имя события в файл подтверждений (с fsync). Родитель убивает
+его SIGKILL в случайный момент и проверяет, что каждая подтвержденная
+запись есть в базе и PRAGMA integrity_check возвращает ok.
+
+Проверяется только падение процесса: данные в page cache ОС переживают
+SIGKILL при любом SQLITE_SYNCHRONOUS. Потерю при сбое питания (NORMAL в
+режиме WAL) этот прогон не обнаружит:
+
+    python -m benchmarks.write_crash --rounds 5
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+async def child(acks: str, writers: int) -> None:
+    from app.database import AsyncSQLDataBase, EventCreate
+
+    database = AsyncSQLDataBase()
+    date = datetime.now() + timedelta(days=3650)
+    counter = iter(range(sys.maxsize))
+    stream = open(acks, "a", encoding="utf-8")
+
+    async def writer(index: int):
+        for i in counter:
+            name = f"crash {i}"
+            await database.add_event(
+                str(index), EventCreate(event_name=name, event_date=date)
+            )
+            stream.write(name + "\n")
+            stream.flush()
+            os.fsync(stream.fileno())
+
+    print("ready", flush=True)
+    await asyncio.gather(*(writer(index) for index in range(writers)))
+
+
+def check(database: str, acks: str) -> tuple[int, int, str]:
+    """
+    Число подтвержденных записей, сколько из них нет в базе, integrity_check
+    """
+    with open(acks, encoding="utf-8") as stream:
+        acknowledged = {line.strip() for line in stream if line.endswith("\n")}
+    connection = sqlite3.connect(database + ".db")
+    try:
+        integrity = connection.execute("PRAGMA integrity_check").fetchone()[0]
+        stored = {
+            name for (name,) in connection.execute("SELECT event_name FROM event")
+        }
+    finally:
+        connection.close()
+    return len(acknowledged), len(acknowledged - stored), integrity
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--writers", type=int, default=50)
+    parser.add_argument("--min-delay", type=float, default=0.5)
+    parser.add_argument("--max-delay", type=float, default=3.0)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(child(args.child, args.writers))
+        return
+
+    rng = random.Random()
+    failed = False
+    for round in range(args.rounds):
+        directory = tempfile.mkdtemp(prefix="crash_")
+        database = os.path.join(directory, "crash")
+        acks = os.path.join(directory, "acks")
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.write_crash",
+                "--child",
+                acks,
+                "--writers",
+                str(args.writers),
+            ],
+            env=dict(os.environ, DATABASE_NAME=database),
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        if process.stdout.readline().strip() != "ready":
+            sys.exit(f"child failed to start: {process.wait()}")
+        time.sleep(rng.uniform(args.min_delay, args.max_delay))
+        process.send_signal(signal.SIGKILL)
+        process.wait()
+
+        acknowledged, lost, integrity = check(database, acks)
+        ok = lost == 0 and integrity == "ok"
+        failed |= not ok
+        print(
+            f"round {round + 1}: acknowledged {acknowledged}, lost {lost}, "
+            f"integrity {integrity} {'OK' if ok else 'FAIL'}"
+        )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -120,7 +120,7 @@ class EventNotofication(BaseModel):
 ### SQL Manipulation
 
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from functools import wraps
 
 
@@ -205,6 +205,38 @@ class SQLDataBase:
             ]
         return []
 
+    @handle_db_query
+    def get_user_events_grouped(
+        self,
+        user_id: str,
+        start: datetime,
+        end: datetime,
+        session: Session = None,
+    ) -> dict[date, list[EventResponse]]:
+        """
+        События пользователя за весь диапазон одним запросом, по дням
+        """
+        query = (
+            session.query(Event)
+            .filter(
+                Event.user_id == user_id,
+                Event.event_date >= start,
+                Event.event_date < end,
+            )
+            .order_by(Event.event_date)
+            .all()
+        )
+        grouped: dict[date, list[EventResponse]] = {}
+        for _q in query:
+            grouped.setdefault(_q.event_date.date(), []).append(
+                EventResponse(
+                    event_name=_q.event_name,
+                    event_day=f"{_q.event_date.day}.{_q.event_date.month}",
+                    event_time=f"{_q.event_date.hour}:{_q.event_date.minute}",
+                )
+            )
+        return grouped
+
     @handle_db_query
     def add_event(self, user_id: str, event: EventCreate, session: Session = None):
         db_event = Event(
@@ -455,6 +487,7 @@ async def show_schedule(message: types.Message):
         events = database.get_user_events(str(message.chat.id), start, end)
 
     elif message.text[1:] == "week":
+        grouped = database.get_user_events_grouped(str(message.chat.id), start, end)
         schedule = []
         while start < end:
             if start.weekday() == 6:
@@ -468,9 +501,7 @@ async def show_schedule(message: types.Message):
                     )
                 )
 
-            events = database.get_user_events(
-                str(message.chat.id), start, start + timedelta(days=1)
-            )
+            events = grouped.get(start.date(), [])
 
             if events:
                 schedule[-1] += (
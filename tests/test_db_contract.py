@@ -0,0 +1,163 @@
+"""
+Контракт SQLDataBase: одни и те же операции и ожидания для SQLite и
+Postgres (DATABASE_URL, см. conftest).
+"""
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from app.database.base import EventArchive, db
+from app.database.models import EventCreate, SeriesCreate
+
+
+def names(events) -> list[str]:
+    return [event.event_name for event in events]
+
+
+@pytest.fixture
+def chat(database, prefix) -> str:
+    chat = f"{prefix}-1"
+    database.ensure_account(chat)
+    return chat
+
+
+@pytest.fixture
+def added(database, chat, now):
+    return [
+        database.add_event(
+            chat, EventCreate(event_name=f"e{i}", event_date=now + timedelta(hours=i))
+        )
+        for i in range(1, 4)
+    ]
+
+
+@pytest.fixture
+def series(database, chat, now):
+    return database.add_series(
+        chat,
+        SeriesCreate(
+            event_name="s", dtstart=now + timedelta(minutes=30), rule="FREQ=DAILY"
+        ),
+    )
+
+
+def test_ensure_account_is_idempotent(database, chat):
+    database.ensure_account(chat)
+    assert database.account_exists(chat)
+
+
+def test_add_and_get_user_events(database, chat, added, now):
+    events = database.get_user_events(chat, now, now + timedelta(days=1))
+    assert names(events) == ["e1", "e2", "e3"]
+
+    grouped = database.get_user_events_grouped(chat, now, now + timedelta(days=7))
+    assert sum(map(len, grouped.values())) == 3
+
+
+def test_series_occurrences_and_pages(database, chat, added, series, now):
+    week = database.get_user_events(chat, now, now + timedelta(days=7))
+    assert len(week) == 3 + 7
+
+    pages, after = [], None
+    while True:
+        page = database.get_user_events_page(
+            chat, now, now + timedelta(days=7), after=after, limit=4
+        )
+        pages.append(page.events)
+        if (after := page.next_cursor) is None:
+            break
+    assert [len(events) for events in pages] == [4, 4, 2]
+    assert [name for events in pages for name in names(events)] == names(week)
+
+
+def test_claim_and_release_events(database, added, series, now):
+    due = added[:1] + series.notifications(now, now + timedelta(hours=1))
+    assert len(database.claim_events(due)) == 2
+    assert not database.claim_events(due)
+
+    database.release_events([added[0].event_id])
+    assert len(database.claim_events(added[:1])) == 1
+
+
+def test_import_events(database, prefix, now):
+    other = f"{prefix}-2"
+    dates = [now + timedelta(days=i, minutes=1) for i in range(10)]
+    result = database.import_events(
+        [
+            (other, EventCreate(event_name=f"i{i}", event_date=dates[i]))
+            for i in range(10)
+        ],
+        batch_size=4,
+        due_until=now + timedelta(days=2, hours=12),
+    )
+    assert result.inserted == {other: 10}
+    assert database.account_exists(other)
+
+    # события из окна - с id из RETURNING, остальные - COPY в Postgres
+    assert [(event.event_name, event.event_date) for event in result.due] == [
+        ("i0", dates[0]),
+        ("i1", dates[1]),
+        ("i2", dates[2]),
+    ]
+    assert len(database.claim_events(result.due)) == 3
+
+    stored = database.get_user_events(other, now, now + timedelta(days=10))
+    assert [(event.event_name, event.event_day) for event in stored] == [
+        (f"i{i}", f"{date.day}.{date.month}") for i, date in enumerate(dates)
+    ]
+
+
+def test_class_timetable(database, chat, prefix):
+    class_name = f"{prefix}-9A"
+    database.save_class_timetable(class_name, {0: [("math", "9:00")]})
+    class_id = database.set_user_class(chat, class_name)
+    assert database.get_user_class(chat) == (class_id, class_name)
+    assert database.get_class_lessons(class_id) == [(0, "math", "9:00")]
+
+    version = database.get_class_versions([class_id])[class_id]
+    database.save_class_timetable(class_name, {1: [("art", "10:00")]})
+    assert database.get_class_versions([class_id]) == {class_id: version + 1}
+    assert database.get_class_lessons(class_id) == [(1, "art", "10:00")]
+
+
+def test_lease(database, prefix):
+    lease = f"{prefix}-lease"
+    assert database.acquire_lease(lease, "a", 30)
+    assert database.acquire_lease(lease, "a", 30)
+    assert not database.acquire_lease(lease, "b", 30)
+
+    database.release_lease(lease, "a")
+    assert database.acquire_lease(lease, "b", 30)
+
+    database.acquire_lease(f"{lease}-expired", "a", -1)
+    assert database.acquire_lease(f"{lease}-expired", "b", 30)
+
+
+def test_archive_and_maintain(database, prefix, now):
+    # далеко в прошлом, чтобы не задеть события других прогонов
+    old = now - timedelta(days=365 * 100)
+    expired = f"{prefix}-3"
+    database.import_events(
+        [(expired, EventCreate(event_name=f"old{i}", event_date=old)) for i in range(3)]
+    )
+    rows = [
+        row
+        for row in database.get_expired_events(old + timedelta(1), False, 1000)
+        if row["user_id"] == expired
+    ]
+    assert len(rows) == 3
+    assert database.archive_events(rows) == 3
+
+    with db.get_session() as session:
+        stored = session.scalar(
+            select(func.count())
+            .select_from(EventArchive)
+            .where(EventArchive.user_id == expired)
+        )
+    assert stored == 3
+    assert not database.get_user_events(expired, old, old + timedelta(1))
+
+    # Postgres: VACUUM (ANALYZE) вне транзакции
+    database.maintain()
@@ -0,0 +1,161 @@
+"""
+Слой состояния в Redis (app.storage, app.leader) на fakeredis в процессе.
+Скрипты RedisLease выполняются через Lua: fakeredis[lua].
+"""
+
+import asyncio
+from datetime import timedelta
+
+import fakeredis
+import pytest
+
+from app.database import AsyncSQLDataBase, EventCreate
+from app.leader import RedisLease
+from app.storage import RedisAccountCache, RedisEventCache
+
+
+def names(events) -> list[str]:
+    return [event.event_name for event in events]
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+@pytest.fixture
+async def async_database(redis):
+    database = AsyncSQLDataBase(event_cache=RedisEventCache(redis=redis))
+    yield database
+    await database.drain()
+    database.close()
+
+
+@pytest.fixture
+def start(now):
+    return now + timedelta(days=1)
+
+
+async def test_account_cache(redis, async_database, prefix, count_queries):
+    chats = [f"{prefix}-{i}" for i in range(3)]
+    for chat_id in chats:
+        await async_database.ensure_account(chat_id)
+    accounts = RedisAccountCache(async_database, redis=redis, chunk=2)
+    await accounts.warm()
+    assert await redis.smembers(RedisAccountCache.key) >= set(chats)
+
+    with count_queries() as stats:
+        await accounts.ensure(chats[1])
+    assert stats.queries == 0
+
+    new = f"{prefix}-new"
+    await accounts.ensure(new)
+    assert await async_database.account_exists(new)
+    assert await redis.sismember(RedisAccountCache.key, new)
+
+    # другая реплика с тем же Redis видит аккаунт без базы
+    replica = RedisAccountCache(async_database, redis=redis)
+    with count_queries() as stats:
+        await replica.ensure(new)
+    assert stats.queries == 0
+
+
+async def test_event_cache_reads(redis, async_database, prefix, start, count_queries):
+    chat = f"{prefix}-1"
+    end = start + timedelta(days=1)
+    await async_database.add_event(
+        chat, EventCreate(event_name="first", event_date=start)
+    )
+
+    events = await async_database.get_user_events(chat, start, end)
+    with count_queries() as stats:
+        cached = await async_database.get_user_events(chat, start, end)
+    assert names(cached) == names(events) == ["first"]
+    assert stats.queries == 0
+    ttl = await redis.ttl(RedisEventCache._key(chat))
+    assert 0 < ttl <= async_database.event_cache.ttl
+
+    grouped = await async_database.get_user_events_grouped(chat, start, end)
+    with count_queries() as stats:
+        cached = await async_database.get_user_events_grouped(chat, start, end)
+    assert {day: names(items) for day, items in cached.items()} == {
+        day: names(items) for day, items in grouped.items()
+    }
+    assert stats.queries == 0
+
+
+async def test_add_event_invalidates(redis, async_database, prefix, start):
+    chat = f"{prefix}-1"
+    end = start + timedelta(days=1)
+    await async_database.add_event(
+        chat, EventCreate(event_name="first", event_date=start)
+    )
+    await async_database.get_user_events(chat, start, end)
+    assert await redis.exists(RedisEventCache._key(chat))
+
+    await async_database.add_event(
+        chat, EventCreate(event_name="second", event_date=start + timedelta(hours=1))
+    )
+    assert not await redis.exists(RedisEventCache._key(chat))
+    assert names(await async_database.get_user_events(chat, start, end)) == [
+        "first",
+        "second",
+    ]
+
+
+async def test_import_events_invalidates(redis, async_database, prefix, start):
+    chat, other = f"{prefix}-1", f"{prefix}-2"
+    end = start + timedelta(days=1)
+    await async_database.get_user_events(chat, start, end)
+    await async_database.get_user_events(other, start, end)
+
+    await async_database.import_events(
+        [(other, EventCreate(event_name="imported", event_date=start))]
+    )
+    # только импортированные чаты
+    assert not await redis.exists(RedisEventCache._key(other))
+    assert await redis.exists(RedisEventCache._key(chat))
+    assert names(await async_database.get_user_events(other, start, end)) == [
+        "imported"
+    ]
+
+
+async def test_event_cache_falls_back_to_database(prefix, start):
+    server = fakeredis.FakeServer()
+    server.connected = False
+    database = AsyncSQLDataBase(
+        event_cache=RedisEventCache(
+            redis=fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        )
+    )
+    chat = f"{prefix}-1"
+    try:
+        await database.add_event(
+            chat, EventCreate(event_name="first", event_date=start)
+        )
+        events = await database.get_user_events(chat, start, start + timedelta(1))
+    finally:
+        await database.drain()
+        database.close()
+    assert names(events) == ["first"]
+
+
+async def test_lease(redis):
+    lease = RedisLease(redis)
+    assert await lease.acquire("reminders", "a", 30)
+    assert not await lease.acquire("reminders", "b", 30)
+    # продление держателем
+    assert await lease.acquire("reminders", "a", 30)
+
+    await lease.release("reminders", "b")
+    assert not await lease.acquire("reminders", "b", 30)
+    await lease.release("reminders", "a")
+    assert await lease.acquire("reminders", "b", 30)
+
+
+async def test_lease_expires(redis):
+    lease = RedisLease(redis)
+    assert await lease.acquire("short", "a", 0.2)
+    assert not await lease.acquire("short", "b", 0.2)
+    await asyncio.sleep(0.3)
+    assert await lease.acquire("short", "b", 30)
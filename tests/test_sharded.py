@@ -0,0 +1,232 @@
+"""
+Шардирование app.workers на настоящем telegram_worker и RemoteReminders,
+без Telegram: Bot каждого воркера работает через MockSession
+(benchmarks.bench_handlers) и записывает отправленные сообщения.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from aiohttp import web
+
+from app.workers import Supervisor, jump_hash, poll_updates
+from benchmarks.updates import make_update
+
+REMINDER_PREFIX = "⏰"
+WORKERS = 3
+CHATS = 20
+# /add на чат
+ADDS = 2
+TIMEOUT = 180.0
+
+
+def sent_path(index: int) -> str:
+    return os.path.join(os.environ["SHARDED_CHECK_DIR"], f"worker-{index}.jsonl")
+
+
+async def checked_worker(index: int, owner: bool, control):
+    """
+    telegram_worker с Bot без сети: каждое SendMessage дописывается в
+    worker-{index}.jsonl
+    """
+    from aiogram.methods import SendMessage
+
+    from app import telebot
+    from app.workers import telegram_worker
+    from benchmarks.bench_handlers import MockSession
+
+    class RecordingSession(MockSession):
+        async def make_request(self, bot, method, timeout=None):
+            if isinstance(method, SendMessage):
+                reply = method.reply_parameters
+                record = {
+                    "chat_id": int(method.chat_id),
+                    "text": method.text,
+                    "reply_to": reply.message_id if reply else None,
+                }
+                with open(sent_path(index), "a", encoding="utf-8") as stream:
+                    stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            return await super().make_request(bot, method, timeout)
+
+    telebot.bot.session = RecordingSession()
+    return await telegram_worker(index, owner, control)
+
+
+def read_sent(workers: int) -> dict[int, list[dict]]:
+    sent = {}
+    for index in range(workers):
+        try:
+            with open(sent_path(index), encoding="utf-8") as stream:
+                sent[index] = [json.loads(line) for line in stream]
+        except FileNotFoundError:
+            sent[index] = []
+    return sent
+
+
+def reminders_sent(sent: dict[int, list[dict]]) -> list[tuple[int, str]]:
+    return [
+        (index, record["text"])
+        for index, records in sent.items()
+        for record in records
+        if record["text"].startswith(REMINDER_PREFIX)
+    ]
+
+
+@pytest.fixture
+def sharded_env(tmp_path, monkeypatch) -> str:
+    """
+    Воркеры (spawn) наследуют окружение: свой каталог и своя база SQLite
+    """
+    monkeypatch.setenv("SHARDED_CHECK_DIR", str(tmp_path))
+    monkeypatch.setenv("DATABASE_NAME", str(tmp_path / "sharded"))
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    return str(tmp_path / "sharded.db")
+
+
+async def test_workers(sharded_env):
+    # в окне напоминания: уходят сразу после добавления
+    date = (datetime.now() + timedelta(minutes=10)).strftime("%Y-%m-%d %H:%M")
+    names = {
+        f"check-{chat_id}-{n}" for chat_id in range(1, CHATS + 1) for n in range(ADDS)
+    }
+    # чаты вперемешку: шаг за шагом по всем чатам
+    updates = []
+    for step in range(ADDS + 2):
+        for chat_id in range(1, CHATS + 1):
+            if step == 0:
+                text = "/start"
+            elif step <= ADDS:
+                text = f"/add check-{chat_id}-{step - 1} {date}"
+            else:
+                text = "/today"
+            updates.append(make_update(len(updates) + 1, chat_id, text))
+
+    supervisor = Supervisor(workers=WORKERS, setup=f"{__name__}:checked_worker")
+    supervisor.start()
+    started = time.monotonic()
+    try:
+        for data in updates:
+            await supervisor.put_wait(data)
+        while len(reminders_sent(read_sent(WORKERS))) < len(names):
+            if time.monotonic() - started > TIMEOUT:
+                break
+            await asyncio.sleep(0.5)
+    finally:
+        await supervisor.stop(timeout=60)
+    sent = read_sent(WORKERS)
+
+    # ответы каждого чата отправил один воркер - jump_hash(chat_id) - и в
+    # порядке апдейтов
+    replies: dict[int, list[tuple[int, int]]] = {}
+    for index, records in sent.items():
+        for record in records:
+            if record["reply_to"] is not None:
+                replies.setdefault(record["chat_id"], []).append(
+                    (index, record["reply_to"])
+                )
+    for chat_id in range(1, CHATS + 1):
+        expected = [
+            data["update_id"]
+            for data in updates
+            if data["message"]["chat"]["id"] == chat_id
+        ]
+        chat_replies = replies.get(chat_id, [])
+        assert [message_id for _, message_id in chat_replies] == expected
+        assert {index for index, _ in chat_replies} == {jump_hash(chat_id, WORKERS)}
+    assert {jump_hash(chat_id, WORKERS) for chat_id in replies} == set(range(WORKERS))
+
+    # события из /add в любом воркере дошли до владельца напоминаний
+    # (воркер 0) и каждое напомнено ровно один раз
+    reminded = reminders_sent(sent)
+    assert {index for index, _ in reminded} == {0}
+    reminded_names = [
+        name for _, text in reminded for name in names if f" {name} " in text
+    ]
+    assert sorted(reminded_names) == sorted(names)
+
+    connection = sqlite3.connect(sharded_env)
+    try:
+        notified = connection.execute(
+            "SELECT count(*) FROM event WHERE notified = 1"
+        ).fetchone()[0]
+    finally:
+        connection.close()
+    assert notified == len(names)
+
+
+class CollectingSupervisor:
+    def __init__(self):
+        self.updates: list[dict] = []
+
+    async def put_wait(self, data: dict) -> None:
+        self.updates.append(data)
+
+
+async def test_polling_backs_off_on_errors():
+    """
+    Локальный getUpdates: 409, 429 с retry_after=1, ответ не-JSON, затем
+    два апдейта
+    """
+    replies = [
+        (409, {"ok": False, "error_code": 409, "description": "Conflict"}),
+        (
+            429,
+            {
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests",
+                "parameters": {"retry_after": 1},
+            },
+        ),
+        (502, "Bad Gateway"),
+        (200, {"ok": True, "result": [make_update(1, 1, "/today")]}),
+        (200, {"ok": True, "result": [make_update(2, 1, "/week")]}),
+    ]
+    requests: list[tuple[float, int]] = []
+
+    async def get_updates(request: web.Request) -> web.Response:
+        body = await request.json()
+        requests.append((time.monotonic(), body["offset"]))
+        if len(requests) > len(replies):
+            await asyncio.sleep(body["timeout"])
+            return web.json_response({"ok": True, "result": []})
+        status, reply = replies[len(requests) - 1]
+        if isinstance(reply, str):
+            return web.Response(status=status, text=reply)
+        return web.json_response(reply, status=status)
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/getUpdates", get_updates)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    supervisor = CollectingSupervisor()
+    started = time.monotonic()
+    task = asyncio.create_task(
+        poll_updates(supervisor, "42:check", timeout=1, api=f"http://127.0.0.1:{port}")
+    )
+    try:
+        while len(supervisor.updates) < 2 and time.monotonic() - started < 30:
+            await asyncio.sleep(0.05)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await runner.cleanup()
+
+    # 1s, retry_after 1s, затем 4s
+    gaps = [b[0] - a[0] for a, b in zip(requests, requests[1:])]
+    assert len(gaps) >= 3
+    assert all(gap >= 0.9 for gap in gaps[:2])
+    assert gaps[2] >= 3.9
+
+    # апдейты после ошибок доставлены, offset сдвинут
+    assert [data["update_id"] for data in supervisor.updates] == [1, 2]
+    assert requests[4][1] == 2